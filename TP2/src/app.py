@@ -10,54 +10,147 @@
     This file is the entry point for our dash app.
 '''
 
+import threading
+
+import flask
 
-import dash
 import dash_html_components as html
 import dash_core_components as dcc
-from dash.dependencies import Input, Output, State
-
-import pandas as pd
+from dash.dependencies import ClientsideFunction, Input, Output, State
 
 import preprocess
 import bar_chart
+import serialization
+
+from cube import Cube
+from figure_cache import FigureCache
+from lazy import WARMUP_ROUTE, LazyLoader
+from loading import DATA_PATH
+from word_index import WordIndex
 
 from template import create_template
 from modes import MODES
 
 
-app = dash.Dash(__name__)
+serialization.use_fast_json()
+
+app = serialization.CachedLayoutDash(__name__)
 app.title = 'TP2 | INF8808'
 
+# When True, both display modes are embedded in the page and the radio
+# input switches between them in the browser. When False, every change
+# of mode is sent to the server through radio_updated.
+CLIENTSIDE_MODE_SWITCH = True
+
+# When True, the data is loaded by the first request or by the warm-up
+# route instead of when the app is imported
+LAZY_LOADING = True
+
+# When True, the data, the figures and the layout are rebuilt when a page
+# is loaded, or the app warmed up, after the .csv file changed
+REFRESH_ON_CHANGE = True
+
+# The play shown when the .csv file holds several, by its value in the
+# 'Play' column. When None, the first play in sorted order is shown.
+PLAY = None
+
+# Guards the rebuild of the data when the .csv file changes
+refresh_lock = threading.Lock()
 
-def prep_data():
+
+def get_play(path=DATA_PATH):
+    '''
+        Args:
+            path: The path to the .csv file
+        Returns:
+            The play to show, or None when the file has
+            no 'Play' column.
+    '''
+    plays = preprocess.get_plays(path)
+    if not plays:
+        return None
+    if PLAY is None:
+        return plays[0]
+    if PLAY not in plays:
+        raise ValueError(f'{path} does not hold the play {PLAY!r}, expected one of {plays}')
+
+    return PLAY
+
+
+def prep_data(path=DATA_PATH, play=None):
     '''
         Imports the .csv file and does some preprocessing.
 
+        The file is streamed in chunks and only the columns needed
+        to count the lines are loaded. When the file holds several
+        plays, only the lines of the given play are kept.
+
+        Args:
+            path: The path to the .csv file
+            play: The play to show, as returned by 'get_play'
         Returns:
             A pandas dataframe containing the preprocessed data.
     '''
-    dataframe = pd.read_csv('./assets/data/romeo_and_juliet.csv')
-
-    proc_data = preprocess.summarize_lines(dataframe)
+    proc_data = preprocess.summarize_lines_chunked(path)
+    proc_data = preprocess.select_play(proc_data, play)
     proc_data = preprocess.replace_others(proc_data)
     proc_data = preprocess.clean_names(proc_data)
 
     return proc_data
 
 
-def init_app_layout(figure):
+def build_figures(path):
+    '''
+        Draws the finished bar chart for every display mode.
+
+        The figures are frozen to dictionaries, so they are
+        not converted again each time they are sent.
+
+        Args:
+            path: The path to the .csv file
+        Returns:
+            A dictionary mapping each mode to its figure.
+    '''
+    proc_data = prep_data(path, get_play(path))
+
+    return {
+        mode: serialization.freeze_figure(bar_chart.draw(bar_chart.init_figure(), proc_data, mode))
+        for mode in MODES.values()
+    }
+
+
+def build_cube(path, play=None):
+    '''
+        Args:
+            path: The path to the .csv file
+            play: The play to show, as returned by 'get_play'
+        Returns:
+            The cube of the line counts of the play.
+    '''
+    keys = preprocess.get_keys(path, ['Act', 'Scene', 'Player'])
+    counts = preprocess.count_lines_chunked(path, keys)
+
+    return Cube(preprocess.select_play(counts, play))
+
+
+def init_app_layout(figure, series=None, play=None):
     '''
         Generates the HTML layout representing the app.
 
         Args:
             figure: The figure to display.
+            series: The data of every display mode, used to switch
+                modes in the browser, or None to switch on the server.
+            play: The name of the play shown, or None for the
+                default file
         Returns:
             The HTML structure of the app's web page.
     '''
     return html.Div(className='content', children=[
         html.Header(children=[
             html.H1('Who\'s Speaking?'),
-            html.H2('An analysis of Shakespeare\'s Romeo and Juliet')
+            html.H2(f'An analysis of Shakespeare\'s {play}' if play is not None
+                    else 'An analysis of Shakespeare\'s Romeo and Juliet')
         ]),
         html.Main(children=[
             html.Div(className='viz-container', children=[
@@ -73,7 +166,42 @@ def init_app_layout(figure):
                     className='graph',
                     id='line-chart'
                 )
-            ])
+            ]),
+            html.Div(className='viz-container', children=[
+                dcc.Graph(
+                    figure=bar_chart.init_scene_figure(),
+                    config=dict(
+                        scrollZoom=False,
+                        showTips=False,
+                        showAxisDragHandles=False,
+                        doubleClick=False,
+                        displayModeBar=False
+                    ),
+                    className='graph',
+                    id='scene-chart'
+                )
+            ]),
+            html.Div(className='viz-container', children=[
+                dcc.Input(
+                    id='search-input',
+                    type='text',
+                    placeholder='Search for a word',
+                    debounce=True
+                ),
+                dcc.Graph(
+                    figure=bar_chart.draw_word(word_index, None),
+                    config=dict(
+                        scrollZoom=False,
+                        showTips=False,
+                        showAxisDragHandles=False,
+                        doubleClick=False,
+                        displayModeBar=False
+                    ),
+                    className='graph',
+                    id='word-chart'
+                )
+            ]),
+            dcc.Store(id='mode-series', data=series)
         ]),
         html.Footer(children=[
             html.Div(className='panel', children=[
@@ -103,32 +231,160 @@ def init_app_layout(figure):
     ])
 
 
-@app.callback(
-    [Output('line-chart', 'figure'), Output('mode', 'children')],
-    [Input('radio-items', 'value')],
-    [State('line-chart', 'figure')]
-)
-def radio_updated(mode, figure):
+def radio_updated(mode):
     '''
         Updates the application after the radio input is modified.
 
+        The figure for each mode is drawn once at startup, so
+        this only looks it up in the figure cache.
+
         Args:
             mode: The mode selected in the radio input.
-            figure: The figure as it is currently displayed
         Returns:
             new_fig: The figure to display after the change of radio input
             mode: The new mode
     '''
-    new_fig = bar_chart.draw(figure, data, mode)
-    bar_chart.update_y_axis(new_fig, mode)
-    
+    new_fig = figures.get(mode)
+
     return new_fig, mode
 
 
-data = prep_data()
+@app.callback(
+    Output('scene-chart', 'figure'),
+    [Input('line-chart', 'clickData'), Input('radio-items', 'value')]
+)
+def act_clicked(click_data, mode):
+    '''
+        Drills down into the act clicked in the bar chart, showing
+        the lines per scene of that act. The data is read from the
+        precomputed cube.
+
+        Args:
+            click_data: The clickData of the bar chart
+            mode: The mode selected in the radio input.
+        Returns:
+            The figure displaying the scenes of the clicked act.
+    '''
+    if click_data is None:
+        return bar_chart.init_scene_figure()
+
+    act = click_data['points'][0]['x']
+
+    return bar_chart.draw_scenes(cube, act, mode)
+
+
+@app.callback(
+    Output('word-chart', 'figure'),
+    [Input('search-input', 'value')]
+)
+def search_updated(word):
+    '''
+        Shows which players say the searched word in each act.
+        The lines are found through the inverted word index.
+
+        Args:
+            word: The word typed in the search input
+        Returns:
+            The figure displaying who says the word.
+    '''
+    return bar_chart.draw_word(word_index, word)
+
+
+def load_data(loader):
+    '''
+        Loads the data, then builds the figures and the layout.
+
+        Args:
+            loader: The lazy loader timing each stage
+    '''
+    global figures, play, cube, word_index  # pylint: disable=global-statement
+
+    with loader.stage('template'):
+        create_template()
+
+    with loader.stage('figures'):
+        figures = FigureCache(DATA_PATH, build_figures)
+        play = get_play(DATA_PATH)
+
+    with loader.stage('cube'):
+        cube = build_cube(DATA_PATH, play)
+
+    with loader.stage('word_index'):
+        word_index = WordIndex(DATA_PATH, play=play)
+
+    with loader.stage('layout'):
+        app.layout = get_layout()
+
+
+def get_layout():
+    '''
+        Returns:
+            The layout of the app, showing the figures of
+            the figure cache.
+    '''
+    fig = figures.get(MODES['count'])
+    if CLIENTSIDE_MODE_SWITCH:
+        return init_app_layout(fig, bar_chart.get_mode_series(figures.figures), play)
+    return init_app_layout(fig, play=play)
+
+
+def refresh_data():
+    '''
+        Rebuilds the figures, the cube, the word index and the
+        layout if the .csv file changed since they were built.
+        The new layout is encoded again by the next page load.
+
+        Returns:
+            True if they were rebuilt.
+    '''
+    global play, cube, word_index  # pylint: disable=global-statement
+
+    with refresh_lock:
+        if not figures.refresh():
+            return False
+
+        play = get_play(DATA_PATH)
+        cube = build_cube(DATA_PATH, play)
+        word_index = WordIndex(DATA_PATH, play=play)
+        app.layout = get_layout()
+
+    return True
+
+
+def refresh_before_request():
+    '''
+        Checks the .csv file before a page loads its layout
+        and before a warm-up, once the data is loaded.
+    '''
+    if loader.ready and (flask.request.path.endswith('_dash-layout')
+                         or flask.request.path == WARMUP_ROUTE):
+        refresh_data()
+
+
+# Set by load_data
+figures = play = cube = word_index = None
+
+loader = LazyLoader(load_data)
+loader.init_server(app.server)
 
-create_template()
+if REFRESH_ON_CHANGE:
+    app.server.before_request(refresh_before_request)
 
-fig = bar_chart.init_figure()
+if LAZY_LOADING:
+    # Replaced by the real layout once the data is loaded
+    app.layout = html.Div(className='content')
+else:
+    loader.ensure_loaded()
 
-app.layout = init_app_layout(fig)
+if CLIENTSIDE_MODE_SWITCH:
+    app.clientside_callback(
+        ClientsideFunction(namespace='bar_chart', function_name='switch_mode'),
+        [Output('line-chart', 'figure'), Output('mode', 'children')],
+        [Input('radio-items', 'value')],
+        [State('mode-series', 'data'), State('line-chart', 'figure')]
+    )
+else:
+    app.callback(
+        [Output('line-chart', 'figure'), Output('mode', 'children')],
+        [Input('radio-items', 'value')]
+    )(radio_updated)
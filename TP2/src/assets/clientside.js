@@ -0,0 +1,25 @@
+window.dash_clientside = Object.assign({}, window.dash_clientside, {
+    bar_chart: {
+        /*
+         * Swaps the bar chart to the selected mode using the series
+         * embedded in the page, without a request to the server.
+         */
+        switch_mode: function (mode, series, figure) {
+            const selected = series[mode];
+            const data = figure.data.map(function (trace, i) {
+                return Object.assign({}, trace, {
+                    y: selected.y[i],
+                    hovertemplate: selected.hovertemplate[i]
+                });
+            });
+            const yaxis = Object.assign({}, figure.layout.yaxis, {
+                title: Object.assign({}, (figure.layout.yaxis || {}).title, {
+                    text: selected.yaxis_title
+                })
+            });
+            const layout = Object.assign({}, figure.layout, {yaxis: yaxis});
+
+            return [Object.assign({}, figure, {data: data, layout: layout}), mode];
+        }
+    }
+});
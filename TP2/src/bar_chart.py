@@ -8,6 +8,7 @@ import plotly.io as pio
 
 from hover_template import get_hover_template
 from modes import MODES, MODE_TO_COLUMN
+from preprocess import pivot_acts_players
 
 
 def init_figure():
@@ -47,32 +48,119 @@ def draw(fig, data, mode):
     fig = go.Figure(fig)  # conversion back to Graph Object
     # TODO : Update the figure's data according to the selected mode
 
-    data.sort_values(by=['Act', 'Player'], inplace=True)
-    
-    acts = []
-    players = {}
+    acts, players, matrix = pivot_acts_players(data, MODE_TO_COLUMN[mode])
+    acts = ['Act ' + str(act) for act in acts]
+
     fig.data = []
-    for act in data["Act"].unique():
-        acts.append('Act ' + str(act))
-
-    for i, player in enumerate(list(data["Player"])):
-        if player not in players:
-            players[player] = [0]*5
-        if (mode == MODES["count"]):
-            players[player][list(data["Act"])[i] - 1] = list(data["LineCount"])[i]
-        else:
-            players[player][list(data["Act"])[i] - 1] = list(data["LinePercent"])[i]
-
-    for player in data["Player"].unique():
-        fig.add_trace(
-            go.Bar(name=player, x=acts, y = players[player], hovertemplate = get_hover_template(player, mode))
-        )
+    fig.add_traces([
+        go.Bar(name=player, x=acts, y=matrix[:, i], hovertemplate=get_hover_template(player, mode))
+        for i, player in enumerate(players)
+    ])
+    fig.update_layout(barmode="stack",
+                    hovermode="closest",
+    )
+    return update_y_axis(fig, mode)
+
+
+def init_message_figure(title, text):
+    '''
+        Initializes a figure displaying a message instead of data.
+
+        Args:
+            title: The title of the figure
+            text: The message to display
+        Returns:
+            fig: The figure displaying the message
+    '''
+    fig = init_figure()
+    fig.update_layout(
+        title=title,
+        xaxis_visible=False,
+        yaxis_visible=False,
+        annotations=[dict(
+            x=0.5, y=0.5, xref='paper', yref='paper', showarrow=False,
+            text=text
+        )]
+    )
+
+    return fig
+
+
+def init_scene_figure():
+    '''
+        Initializes the figure used to display the lines per scene
+        of the act selected in the bar chart.
+
+        Returns:
+            fig: The figure with a message asking to select an act
+    '''
+    return init_message_figure(
+        'Lines per scene',
+        'Click on an act in the chart above to see its scenes.')
+
+
+def draw_scenes(cube, act, mode):
+    '''
+        Draws the bar chart of the lines per scene in the given act.
+
+        Args:
+            cube: The Act / Scene / Player cube
+            act: The label of the selected act (e.g. 'Act 1')
+            mode: Whether to display the count or percent data.
+        Returns:
+            fig: The figure comprising the drawn bar chart
+    '''
+    scenes, groups, matrix = cube.get_scenes(act, mode)
+
+    fig = init_figure()
+    fig.add_traces([
+        go.Bar(name=group, x=scenes, y=matrix[:, i], hovertemplate=get_hover_template(group, mode))
+        for i, group in enumerate(groups)
+    ])
     fig.update_layout(barmode="stack",
                     hovermode="closest",
+                    title='Lines per scene in ' + act,
     )
     return update_y_axis(fig, mode)
 
 
+def draw_word(index, word):
+    '''
+        Draws the bar chart of the lines in which each player
+        says the given word, per act.
+
+        Args:
+            index: The inverted word index
+            word: The searched word
+        Returns:
+            fig: The figure comprising the drawn bar chart
+    '''
+    if not word or not word.strip():
+        return init_message_figure(
+            'Who says it?',
+            'Type a word above to see who says it in each act.')
+
+    acts, players, matrix = index.search(word)
+    if not len(players):
+        return init_message_figure(
+            'Who says it?',
+            'Nobody says \'' + word.strip() + '\' in the play.')
+
+    acts = ['Act ' + str(act) for act in acts]
+
+    fig = init_figure()
+    fig.add_traces([
+        go.Bar(name=player, x=acts, y=matrix[:, i],
+               hovertemplate=get_hover_template(player, MODES['count']))
+        for i, player in enumerate(players)
+    ])
+    fig.update_layout(barmode="stack",
+                    hovermode="closest",
+                    title='Lines saying \'' + word.strip() + '\' per act',
+    )
+    return update_y_axis(fig, MODES['count'])
+
+
 def update_y_axis(fig, mode):
     '''
         Updates the y axis to say 'Lines (%)' or 'Lines (Count) depending on
@@ -91,4 +179,27 @@ def update_y_axis(fig, mode):
         y_axis_title = 'Lines (%)'
     
     fig.update_layout(yaxis_title=y_axis_title)
-    return fig
\ No newline at end of file
+    return fig
+
+
+def get_mode_series(figures):
+    '''
+        Extracts what changes between the display modes from
+        their finished figures, so the browser can switch
+        between them without asking the server.
+
+        Args:
+            figures: A mapping from each mode to its figure,
+                frozen as a dictionary
+        Returns:
+            A dictionary mapping each mode to the 'y' values and
+            hover template of every trace and to the y axis title
+    '''
+    return {
+        mode: dict(
+            y=[trace['y'] for trace in fig['data']],
+            hovertemplate=[trace['hovertemplate'] for trace in fig['data']],
+            yaxis_title=fig['layout']['yaxis']['title']['text']
+        )
+        for mode, fig in figures.items()
+    }
@@ -0,0 +1,180 @@
+'''
+    Measures how the preprocessing and drawing pipeline scales with the
+    size of the play.
+
+    Synthetic plays of increasing sizes are written to a temporary folder,
+    then each stage of the pipeline is timed on them and its peak memory
+    is traced. The results are written as one JSON object per line so
+    runs can be compared. Run from this folder, for example :
+
+        python benchmark.py --sizes 1000 100000 --speakers 50 --output results.jsonl
+'''
+import argparse
+import json
+import os
+import platform
+import resource
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+import plotly
+
+import app
+import bar_chart
+import preprocess
+
+from figure_cache import FigureCache
+from modes import MODES
+from template import create_template
+
+SIZES = [10**3, 10**4, 10**5, 10**6, 10**7]
+SPEAKERS = 100
+ACTS = 5
+SCENES = 6
+WORDS = ['love', 'night', 'death', 'sweet', 'fair', 'sword', 'heaven', 'poison', 'light', 'day']
+
+# Number of rows generated and written at a time
+WRITE_CHUNK_SIZE = 10**6
+
+
+def write_play(path, lines, speakers, seed=0):
+    '''
+        Writes a synthetic play with the same columns as the
+        original .csv file. The speakers' number of lines
+        follows a Zipf-like distribution, like in a real play.
+
+        Args:
+            path: The path of the .csv file to write
+            lines: The number of lines in the play
+            speakers: The number of distinct speakers
+            seed: The seed of the random generator
+    '''
+    rng = np.random.default_rng(seed)
+    weights = 1 / np.arange(1, speakers + 1)
+    weights /= weights.sum()
+    names = np.array(['PLAYER ' + str(i) for i in range(speakers)])
+    words = np.array(WORDS)
+
+    for start in range(0, lines, WRITE_CHUNK_SIZE):
+        count = min(WRITE_CHUNK_SIZE, lines - start)
+        position = np.arange(start, start + count)
+        chunk = pd.DataFrame({
+            'Act': 1 + position * ACTS // lines,
+            'Scene': position * ACTS * SCENES // lines % SCENES,
+            'Line': position,
+            'Player': names[rng.choice(speakers, count, p=weights)],
+            'PlayerLine': pd.Series(words[rng.integers(0, len(words), count)]) + ' and '
+            + pd.Series(words[rng.integers(0, len(words), count)])
+        })
+        chunk.to_csv(path, mode='w' if start == 0 else 'a', header=start == 0, index=False)
+
+
+def measure(stage, *args):
+    '''
+        Runs a stage once to time it, then once more while
+        tracing its memory allocations.
+
+        Args:
+            stage: The function to run
+            args: The arguments to pass to the function
+        Returns:
+            result: The value returned by the stage
+            seconds: The time taken by the untraced run
+            peak: The peak traced memory, in bytes
+    '''
+    start = time.perf_counter()
+    result = stage(*args)
+    seconds = time.perf_counter() - start
+
+    tracemalloc.start()
+    stage(*args)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return result, seconds, peak
+
+
+def run(path, lines, speakers):
+    '''
+        Runs every stage of the pipeline on the given play.
+
+        Args:
+            path: The path to the synthetic .csv file
+            lines: The number of lines in the play
+            speakers: The number of distinct speakers
+        Returns:
+            One result dictionary per stage.
+    '''
+    results = []
+
+    def record(stage, function, *args):
+        result, seconds, peak = measure(function, *args)
+        results.append(dict(lines=lines, speakers=speakers, stage=stage,
+                            seconds=seconds, peak_bytes=peak))
+        return result
+
+    dataframe = record('read_csv', pd.read_csv, path)
+    summary = record('summarize_lines', preprocess.summarize_lines, dataframe)
+    record('summarize_lines_chunked', preprocess.summarize_lines_chunked, path)
+    others = record('replace_others', preprocess.replace_others, summary)
+    cleaned = record('clean_names', lambda data: preprocess.clean_names(data.copy()), others)
+    for mode in MODES.values():
+        record('draw_' + mode.lower(), bar_chart.draw, bar_chart.init_figure(), cleaned, mode)
+
+    # End to end : the figure cache is rebuilt from the file,
+    # then the callback looks the figure up
+    app.figures = record('build_figure_cache', FigureCache, path, app.build_figures)
+    for mode in MODES.values():
+        record('radio_updated_' + mode.lower(), app.radio_updated, mode)
+
+    return results
+
+
+def main():
+    '''
+        Parses the command line, runs the benchmark for every
+        size and writes the results.
+    '''
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0].strip())
+    parser.add_argument('--sizes', type=int, nargs='+', default=SIZES,
+                        help='The numbers of lines of the synthetic plays')
+    parser.add_argument('--speakers', type=int, default=SPEAKERS,
+                        help='The number of distinct speakers in each play')
+    parser.add_argument('--output', default='benchmark_results.jsonl',
+                        help='The file to which the results are appended')
+    args = parser.parse_args()
+
+    # The app only registers its template when its data is loaded
+    create_template()
+
+    environment = dict(
+        python=platform.python_version(),
+        machine=platform.machine(),
+        numpy=np.__version__,
+        pandas=pd.__version__,
+        plotly=plotly.__version__,
+        time=time.strftime('%Y-%m-%dT%H:%M:%S')
+    )
+
+    with tempfile.TemporaryDirectory() as folder, \
+            open(args.output, 'a', encoding='utf-8') as output:
+        for lines in args.sizes:
+            path = os.path.join(folder, 'play_' + str(lines) + '.csv')
+            write_play(path, lines, args.speakers)
+
+            for result in run(path, lines, args.speakers):
+                result.update(environment)
+                result['max_rss_kib'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+                output.write(json.dumps(result) + '\n')
+                print(f"{lines:>10} lines  {result['stage']:<26}"
+                      f"{result['seconds'] * 1000:>12.2f} ms"
+                      f"{result['peak_bytes'] / 2**20:>10.2f} MiB")
+
+            os.remove(path)
+
+
+if __name__ == '__main__':
+    main()
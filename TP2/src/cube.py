@@ -0,0 +1,83 @@
+'''
+    Contains the aggregate cube used to drill down from acts to scenes.
+
+    The line counts are stored in dense NumPy arrays indexed by integer
+    codes at the Act, Act + Scene and Act + Scene + Player levels, so the
+    data for any act can be read without regrouping the dataframe.
+'''
+import numpy as np
+import pandas as pd
+
+from modes import MODES
+from preprocess import select_top, TOP_N
+
+
+class Cube:
+    '''
+        The Act / Scene / Player line count cube.
+    '''
+
+    def __init__(self, counts, top_n=TOP_N):
+        '''
+            Builds every level of the cube in one pass over the counts.
+
+            The players are also grouped like in the bar chart: the
+            'top_n' players with the most lines in the play keep their
+            own group and all the others share the 'Other' group.
+
+            Args:
+                counts: A series of line counts indexed by 'Act',
+                    'Scene' and 'Player'
+                top_n: The number of players to keep in their own group
+        '''
+        index = counts.index
+        act_codes, self.acts = pd.factorize(index.get_level_values('Act'), sort=True)
+        scene_codes, self.scenes = pd.factorize(index.get_level_values('Scene'), sort=True)
+        player_codes, self.players = pd.factorize(index.get_level_values('Player'), sort=True)
+
+        self.scene_players = np.zeros(
+            (len(self.acts), len(self.scenes), len(self.players)), dtype=np.int32)
+        self.scene_players[act_codes, scene_codes, player_codes] = counts.to_numpy()
+        self.scene_totals = self.scene_players.sum(axis=2)
+        self.act_totals = self.scene_totals.sum(axis=1)
+
+        top = select_top(self.scene_players.sum(axis=(0, 1)), top_n)
+        names = [self.players[player].title() for player in top] + ['Other']
+        order = np.argsort(names, kind='stable')
+        self.groups = [names[i] for i in order]
+
+        # One-hot matrix sending each player to its group, in display order
+        group_of_player = np.full(len(self.players), len(top))
+        group_of_player[top] = np.arange(len(top))
+        position = np.empty(len(order), dtype=int)
+        position[order] = np.arange(len(order))
+        membership = np.zeros((len(self.players), len(self.groups)), dtype=np.int32)
+        membership[np.arange(len(self.players)), position[group_of_player]] = 1
+
+        self.scene_groups = self.scene_players @ membership
+        with np.errstate(invalid='ignore', divide='ignore'):
+            self.scene_percents = np.nan_to_num(
+                100 * self.scene_groups / self.scene_totals[:, :, np.newaxis])
+
+        self.act_index = {'Act ' + str(act): i for i, act in enumerate(self.acts)}
+        self.act_scenes = [np.flatnonzero(totals) for totals in self.scene_totals]
+
+    def get_scenes(self, act_label, mode):
+        '''
+            Reads the data for the scenes of one act.
+
+            Args:
+                act_label: The label of the act, as displayed on the
+                    x axis of the bar chart (e.g. 'Act 1')
+                mode: Whether to get the count or percent data
+            Returns:
+                scenes: The labels of the scenes of the act
+                groups: The names of the player groups
+                matrix: A NumPy array of shape (len(scenes), len(groups))
+        '''
+        act = self.act_index[act_label]
+        scenes = self.act_scenes[act]
+        values = self.scene_groups if mode == MODES['count'] else self.scene_percents
+
+        labels = ['Scene ' + str(scene) for scene in self.scenes[scenes]]
+        return labels, self.groups, values[act, scenes]
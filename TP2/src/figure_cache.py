@@ -0,0 +1,79 @@
+'''
+    Keeps the finished bar chart figure for every display mode in memory.
+
+    The figures only depend on the source .csv file and the selected mode,
+    so they are built once and looked up afterwards. The cache remembers
+    the size and modification time of the source file and rebuilds itself
+    when they change.
+'''
+import os
+import threading
+from types import MappingProxyType
+
+
+class FigureCache:
+    '''
+        A read-only mapping from display mode to finished figure.
+    '''
+
+    def __init__(self, path, build):
+        '''
+            Builds the cache for the first time.
+
+            Args:
+                path: The path to the source .csv file
+                build: A function taking the path and returning a
+                    dictionary mapping each mode to its figure
+        '''
+        self.path = path
+        self.build = build
+        self.lock = threading.Lock()
+        self.signature = None
+        self.figures = MappingProxyType({})
+        self.rebuild()
+
+    def get_signature(self):
+        '''
+            Returns:
+                The size and modification time of the source file
+        '''
+        stat = os.stat(self.path)
+        return stat.st_size, stat.st_mtime_ns
+
+    def rebuild(self):
+        '''
+            Rebuilds every figure from the source file and swaps
+            them in at once.
+        '''
+        with self.lock:
+            signature = self.get_signature()
+            self.figures = MappingProxyType(dict(self.build(self.path)))
+            self.signature = signature
+
+    def invalidate(self):
+        '''
+            Forces the figures to be rebuilt from the source file.
+        '''
+        self.rebuild()
+
+    def refresh(self):
+        '''
+            Rebuilds the figures if the source file changed since
+            they were last built.
+
+            Returns:
+                True if the figures were rebuilt
+        '''
+        if self.get_signature() == self.signature:
+            return False
+        self.rebuild()
+        return True
+
+    def get(self, mode):
+        '''
+            Args:
+                mode: The display mode
+            Returns:
+                The finished figure for the given mode
+        '''
+        return self.figures[mode]
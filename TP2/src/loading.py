@@ -0,0 +1,91 @@
+'''
+    Contains the loading profile used to read the .csv file with compact
+    types, and a report of the memory it saves.
+'''
+import pandas as pd
+
+DATA_PATH = './assets/data/romeo_and_juliet.csv'
+
+# Only the columns used by the app are read, with categorical player
+# names, and categorical play names when a file holds several plays.
+# The act and scene numbers are parsed in full, then stored in the
+# smallest unsigned integer type fitting them.
+LINES_PROFILE = dict(
+    usecols=['Act', 'Scene', 'Player', 'PlayerLine'],
+    dtype={'Play': 'category', 'Player': 'category'},
+    downcast={'Act': 'unsigned', 'Scene': 'unsigned'},
+)
+
+
+def downcast_columns(dataframe, downcast):
+    '''
+        Converts the given columns to the smallest numeric type
+        holding their values, once they are parsed, so no value
+        is ever wrapped around.
+
+        Args:
+            dataframe: The dataframe, or a chunk of it
+            downcast: The kind of numeric type of each column,
+                as accepted by pd.to_numeric
+        Returns:
+            The dataframe with the converted columns.
+    '''
+    for col, kind in downcast.items():
+        dataframe[col] = pd.to_numeric(dataframe[col], downcast=kind)
+
+    return dataframe
+
+
+def read_csv(path, profile, columns=None, **kwargs):
+    '''
+        Reads the .csv file using the given loading profile.
+
+        Args:
+            path: The path to the .csv file
+            profile: The loading profile, holding the 'usecols' and
+                the 'dtype', 'downcast', 'parse_dates' and
+                'date_parser' to use when reading
+            columns: The columns to read among the profile's, or
+                None to read all of them
+            kwargs: Other arguments for pd.read_csv, e.g. 'chunksize'
+        Returns:
+            The dataframe, or an iterator over its chunks.
+    '''
+    usecols = list(columns) if columns is not None else profile['usecols']
+    dtype = {col: kind for col, kind in profile.get('dtype', {}).items() if col in usecols}
+    downcast = {col: kind for col, kind in profile.get('downcast', {}).items() if col in usecols}
+    parse_dates = [col for col in profile.get('parse_dates', []) if col in usecols]
+    if parse_dates:
+        kwargs.update(parse_dates=parse_dates, date_parser=profile.get('date_parser'))
+
+    dataframe = pd.read_csv(path, usecols=usecols, dtype=dtype, **kwargs)
+    if not downcast:
+        return dataframe
+    if kwargs.get('chunksize') is not None or kwargs.get('iterator'):
+        return (downcast_columns(chunk, downcast) for chunk in dataframe)
+
+    return downcast_columns(dataframe, downcast)
+
+
+def get_memory_report(path, profile):
+    '''
+        Measures the memory used by the .csv file once loaded with
+        pandas' default types and once loaded with the profile.
+
+        Args:
+            path: The path to the .csv file
+            profile: The loading profile
+        Returns:
+            The number of bytes used before and after applying
+            the profile.
+    '''
+    before = pd.read_csv(path).memory_usage(deep=True).sum()
+    after = read_csv(path, profile).memory_usage(deep=True).sum()
+
+    return dict(before=int(before), after=int(after))
+
+
+if __name__ == '__main__':
+    report = get_memory_report(DATA_PATH, LINES_PROFILE)
+    print(f"Before : {report['before'] / 2**20:.2f} MiB")
+    print(f"After : {report['after'] / 2**20:.2f} MiB")
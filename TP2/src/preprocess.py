@@ -1,9 +1,20 @@
 '''
     Contains some functions to preprocess the data used in the visualisation.
 '''
+import numpy as np
 import pandas as pd
+from loading import LINES_PROFILE, read_csv
 from modes import MODE_TO_COLUMN
 
+# Number of rows read at a time when streaming the .csv file
+CHUNK_SIZE = 100000
+
+# Optional column identifying the play when a file holds several plays
+PLAY_COLUMN = 'Play'
+
+# Default number of players kept by 'replace_others'
+TOP_N = 5
+
 
 def summarize_lines(my_df):
     '''
@@ -22,17 +33,190 @@ def summarize_lines(my_df):
             The modified pandas dataframe containing the
             information described above.
     '''
-    new_cleaned_list = my_df.groupby(['Act', 'Player']).size().reset_index(name='PlayerLine')
-        
-    new_cleaned_list['PlayerPercent'] = 100 * new_cleaned_list['PlayerLine'] / new_cleaned_list.groupby('Act')['PlayerLine'].transform('sum')
-    
-    my_df = new_cleaned_list.sort_values(by=['Act','PlayerLine'], ascending=[True,False])
+    return summarize_counts(my_df.groupby(['Act', 'Player']).size())
+
+
+def summarize_counts(counts):
+    '''
+        Turns the number of lines per player per act into the
+        dataframe described in 'summarize_lines'.
+
+        The last level of the index must be 'Player'. The
+        percentages are computed within each group of the
+        other levels, for example within each act, or within
+        each act of each play when there is a 'Play' level.
+
+        Args:
+            counts: A series of line counts indexed by
+                the grouping keys, sorted by those keys
+        Returns:
+            The summarized pandas dataframe.
+    '''
+    keys = list(counts.index.names[:-1])
+
+    new_cleaned_list = counts.reset_index(name='PlayerLine')
+
+    totals = new_cleaned_list.groupby(keys)['PlayerLine'].transform('sum')
+    new_cleaned_list['PlayerPercent'] = 100 * new_cleaned_list['PlayerLine'] / totals
+
+    my_df = new_cleaned_list.sort_values(by=keys + ['PlayerLine'],
+                                         ascending=[True] * len(keys) + [False])
     return my_df
 
 
-def replace_others(my_df):
+def to_plain(values):
+    '''
+        Args:
+            values: The values of a column read with the loading profile
+        Returns:
+            The values as a NumPy array, with the integers widened
+            to int64 like pd.read_csv reads them by default.
+    '''
+    values = np.asarray(values)
+    if values.dtype.kind in 'iu':
+        values = values.astype(np.int64)
+
+    return values
+
+
+def count_lines_chunked(path, keys, chunksize=CHUNK_SIZE):
+    '''
+        Counts the lines of the .csv file for each combination
+        of the given keys, reading the file in chunks of a fixed
+        number of rows.
+
+        Only the key columns are loaded, with the types of the
+        loading profile, and only the running
+        counts are kept between chunks, so the memory used
+        depends on the number of distinct keys rather than on
+        the size of the file.
+
+        Args:
+            path: The path to the .csv file
+            keys: The names of the columns to group by
+            chunksize: The number of rows to read at a time
+        Returns:
+            A series of line counts indexed by the keys, sorted
+            by the keys.
+    '''
+    counts = None
+    for chunk in read_csv(path, LINES_PROFILE, columns=keys, chunksize=chunksize):
+        chunk_counts = chunk.groupby(keys, observed=True).size()
+        # The categories of a chunk only hold its own names, so the running
+        # counts are kept with plain values, and with the int64 numbers of
+        # a plain read rather than the compact types of the profile
+        levels = [to_plain(chunk_counts.index.get_level_values(key)) for key in keys]
+        # A single key gives a flat index, as the groupby below does
+        chunk_counts.index = pd.MultiIndex.from_arrays(levels, names=keys) if len(keys) > 1 \
+            else pd.Index(levels[0], name=keys[0])
+        if counts is not None:
+            chunk_counts = pd.concat([counts, chunk_counts])
+        counts = chunk_counts.groupby(level=keys).sum()
+
+    if counts is None:
+        counts = pd.Series(
+            [], index=pd.MultiIndex.from_arrays([[]] * len(keys), names=keys), dtype='int64')
+
+    return counts
+
+
+def summarize_lines_chunked(path, chunksize=CHUNK_SIZE):
+    '''
+        Streaming version of 'summarize_lines', which reads the
+        .csv file itself in chunks instead of taking the whole
+        dataframe.
+
+        When the file has a 'Play' column, the lines are
+        counted per play and the result keeps the 'Play'
+        column. Otherwise, the result is identical to
+        'summarize_lines' on the whole file.
+
+        Args:
+            path: The path to the .csv file
+            chunksize: The number of rows to read at a time
+        Returns:
+            The summarized pandas dataframe.
     '''
-        For each act, keeps the 5 players with the most lines
+    keys = get_keys(path, ['Act', 'Player'])
+
+    return summarize_counts(count_lines_chunked(path, keys, chunksize))
+
+
+def get_keys(path, keys):
+    '''
+        Args:
+            path: The path to the .csv file
+            keys: The names of the columns to group by
+        Returns:
+            The keys, preceded by 'Play' when the file has
+            that column.
+    '''
+    if PLAY_COLUMN in pd.read_csv(path, nrows=0).columns:
+        return [PLAY_COLUMN] + list(keys)
+
+    return list(keys)
+
+
+def get_plays(path, chunksize=CHUNK_SIZE):
+    '''
+        Args:
+            path: The path to the .csv file
+            chunksize: The number of rows to read at a time
+        Returns:
+            The sorted plays of the file, or an empty list when
+            the file has no 'Play' column.
+    '''
+    if PLAY_COLUMN not in get_keys(path, []):
+        return []
+
+    counts = count_lines_chunked(path, [PLAY_COLUMN], chunksize)
+
+    return sorted(counts.index.get_level_values(PLAY_COLUMN))
+
+
+def select_play(data, play):
+    '''
+        Keeps the data of a single play.
+
+        Args:
+            data: A dataframe with a 'Play' column, or a series
+                of counts with a 'Play' index level
+            play: The play to keep
+        Returns:
+            The data of the play, without the 'Play' column or
+            level. Data without any is returned unchanged.
+    '''
+    if isinstance(data, pd.Series) and PLAY_COLUMN in data.index.names:
+        return data.xs(play, level=PLAY_COLUMN)
+    if isinstance(data, pd.DataFrame) and PLAY_COLUMN in data.columns:
+        return data[data[PLAY_COLUMN] == play].drop(columns=PLAY_COLUMN)
+
+    return data
+
+
+def select_top(totals, top_n):
+    '''
+        Finds the positions of the largest totals with a partial
+        selection, so only the selected totals are ever sorted.
+
+        Args:
+            totals: A NumPy array of totals
+            top_n: The number of positions to keep
+        Returns:
+            The positions of the 'top_n' largest totals, from
+            the largest to the smallest.
+    '''
+    top_n = max(0, min(top_n, len(totals)))
+    top = np.arange(top_n)
+    if 0 < top_n < len(totals):
+        top = np.argpartition(-totals, top_n - 1)[:top_n]
+
+    return top[np.argsort(-totals[top], kind='stable')]
+
+
+def replace_others(my_df, top_n=TOP_N):
+    '''
+        For each act, keeps the 'top_n' players with the most lines
         throughout the play and groups the other plyaers
         together in a new line where :
 
@@ -41,37 +225,71 @@ def replace_others(my_df):
         - The 'LineCount' column contains the sum
             of the counts of lines in that act of
             all players who are not in the top
-            5 players who have the most lines in
+            'top_n' players who have the most lines in
             the play
         - The 'PercentCount' column contains the sum
             of the percentages of lines in that
             act of all the players who are not in the
-            top 5 players who have the most lines in
+            top 'top_n' players who have the most lines in
             the play
 
+        When there is a 'Play' column, the top players and
+        the 'OTHER' lines are found separately for each play.
+
+        Args:
+            my_df: The dataframe returned by 'summarize_lines'
+            top_n: The number of players to keep
         Returns:
             The df with all players not in the top
-            5 for the play grouped as 'OTHER'
-    '''
-    # Create a new dataframe for storing the grouped 'OTHER' players
-    other_df = my_df.sort_values(by=['Act','PlayerLine'], ascending=[True,False])
-    top_players = other_df.groupby(["Player"])["PlayerLine"].sum().sort_values(ascending=False).head(5).index.tolist()
-    top_players_df = other_df[other_df["Player"].isin(top_players)]
-    
-    all_other_players = other_df[~other_df.index.isin(top_players_df.index)]
-    
-    all_other_players = all_other_players.groupby('Act').agg({
-        'Player' : 'last',
-        'PlayerLine' : 'sum',
-        'PlayerPercent' : 'sum'
-    }).reset_index()
-    
-    all_other_players['Player'] = 'OTHER'
-    
+            'top_n' for the play grouped as 'OTHER'
+    '''
+    keys = [PLAY_COLUMN] if PLAY_COLUMN in my_df.columns else []
+    if keys:
+        play_codes, plays = pd.factorize(my_df[PLAY_COLUMN], sort=True)
+    else:
+        play_codes, plays = np.zeros(len(my_df), dtype=np.intp), [None]
+    player_codes, players = pd.factorize(my_df['Player'])
+    act_codes, acts = pd.factorize(my_df['Act'], sort=True)
+    line_counts = my_df['PlayerLine'].to_numpy()
+    line_percents = my_df['PlayerPercent'].to_numpy()
+
+    # The totals of each player in each play
+    pair_codes, pairs = pd.factorize(play_codes * len(players) + player_codes)
+    totals = np.bincount(pair_codes, weights=line_counts, minlength=len(pairs))
+    pair_plays = pairs // max(len(players), 1)
+
+    is_top = np.zeros(len(pairs), dtype=bool)
+    for play_code in range(len(plays)):
+        candidates = np.flatnonzero(pair_plays == play_code)
+        is_top[candidates[select_top(totals[candidates], top_n)]] = True
+    in_top = is_top[pair_codes]
+
+    top_players_df = my_df[in_top]
+
+    # Sum the counts and percentages of the other players per act of each play in one pass
+    other_sums = np.zeros((len(plays) * len(acts), 3))
+    np.add.at(
+        other_sums,
+        (play_codes * len(acts) + act_codes)[~in_top],
+        np.column_stack([line_counts[~in_top], line_percents[~in_top], np.ones((~in_top).sum())]))
+    has_others = other_sums[:, 2] > 0
+
+    other_columns = {}
+    if keys:
+        other_columns[PLAY_COLUMN] = np.repeat(np.asarray(plays), len(acts))[has_others]
+    other_columns.update({
+        'Act': np.tile(np.asarray(acts), len(plays))[has_others],
+        'Player': 'OTHER',
+        'PlayerLine': other_sums[has_others, 0].astype(line_counts.dtype),
+        'PlayerPercent': other_sums[has_others, 1]
+    })
+    all_other_players = pd.DataFrame(other_columns)
+
     other_df = pd.concat([top_players_df, all_other_players])
-    
-    other_df = other_df.sort_values(by=['Act'], ascending=[True])
-    
+
+    other_df = other_df.sort_values(by=keys + ['Act'], ascending=[True] * (len(keys) + 1),
+                                    kind='stable')
+
     other_df = other_df.rename(columns={"PlayerLine": "LineCount", "PlayerPercent": "LinePercent"})
     return other_df
 
@@ -86,3 +304,38 @@ def clean_names(my_df):
     '''
     my_df['Player'] = my_df['Player'].str.title()
     return my_df
+
+
+def pivot_acts_players(my_df, column):
+    '''
+        Pivots the given column into an Act x Player matrix.
+
+        The acts are sorted in ascending order and the players
+        appear in the order they are first met when the rows
+        are sorted by act, then by name. Any act in which a
+        player does not speak holds a zero.
+
+        The dataframe must hold a single play, so each act
+        and player appears at most once.
+
+        Args:
+            my_df: The dataframe containing the 'Act' and 'Player' columns
+            column: The name of the column holding the values to pivot
+        Returns:
+            acts: The sorted act numbers
+            players: The player names, one per matrix column
+            matrix: A NumPy array of shape (len(acts), len(players))
+    '''
+    if my_df.duplicated(['Act', 'Player']).any():
+        raise ValueError('Each act and player must appear once, '
+                         'the dataframe holds more than one play')
+
+    sorted_df = my_df.sort_values(by=['Act', 'Player'])
+
+    act_codes, acts = pd.factorize(sorted_df['Act'], sort=True)
+    player_codes, players = pd.factorize(sorted_df['Player'])
+
+    matrix = np.zeros((len(acts), len(players)), dtype=sorted_df[column].dtype)
+    matrix[act_codes, player_codes] = sorted_df[column].to_numpy()
+
+    return acts, players, matrix
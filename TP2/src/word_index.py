@@ -0,0 +1,116 @@
+'''
+    Contains the inverted index used to find who says a given word.
+
+    Each word found in the 'PlayerLine' column points to the act, scene
+    and player of every line containing it. The postings of all the words
+    are stored back to back in typed NumPy arrays and the postings of a
+    word are found through an array of offsets.
+'''
+import re
+
+import numpy as np
+import pandas as pd
+
+from loading import LINES_PROFILE, read_csv
+from preprocess import CHUNK_SIZE, PLAY_COLUMN
+
+TOKEN_PATTERN = re.compile(r"[a-z]+(?:'[a-z]+)*")
+
+
+class WordIndex:
+    '''
+        The inverted index from words to the lines where they are said.
+    '''
+
+    def __init__(self, path, chunksize=CHUNK_SIZE, play=None):
+        '''
+            Builds the index from the .csv file, reading it in chunks.
+
+            A line containing a word several times is only
+            counted once for that word.
+
+            Args:
+                path: The path to the .csv file
+                chunksize: The number of rows to read at a time
+                play: The play whose lines are indexed, from the
+                    'Play' column, or None to index every line
+        '''
+        self.vocabulary = {}
+        player_ids = {}
+        terms, acts, scenes, players = [], [], [], []
+
+        columns = LINES_PROFILE['usecols'] + ([PLAY_COLUMN] if play is not None else [])
+        for chunk in read_csv(path, LINES_PROFILE, columns=columns, chunksize=chunksize):
+            if play is not None:
+                chunk = chunk[chunk[PLAY_COLUMN] == play].copy()
+                chunk['Player'] = chunk['Player'].cat.remove_unused_categories()
+            lines = chunk['PlayerLine'].fillna('').str.lower().str.findall(TOKEN_PATTERN)
+            lines = [dict.fromkeys(line) for line in lines]
+            lengths = np.fromiter((len(line) for line in lines), dtype=np.int64, count=len(lines))
+
+            terms.append(np.fromiter(
+                (self.vocabulary.setdefault(word, len(self.vocabulary))
+                 for line in lines for word in line),
+                dtype=np.int32, count=lengths.sum()))
+            acts.append(np.repeat(chunk['Act'].to_numpy(dtype=np.int16), lengths))
+            scenes.append(np.repeat(chunk['Scene'].to_numpy(dtype=np.int16), lengths))
+            # Only the categories of the chunk are looked up, the last
+            # id being used for the lines without a player
+            names = list(chunk['Player'].cat.categories) + ['']
+            player_codes = np.array(
+                [player_ids.setdefault(player, len(player_ids)) for player in names],
+                dtype=np.int32)
+            players.append(np.repeat(player_codes[chunk['Player'].cat.codes.to_numpy()], lengths))
+
+        terms = np.concatenate(terms) if terms else np.zeros(0, dtype=np.int32)
+        order = np.argsort(terms, kind='stable')
+
+        self.offsets = np.zeros(len(self.vocabulary) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(terms, minlength=len(self.vocabulary)), out=self.offsets[1:])
+
+        self.acts = np.concatenate(acts)[order] if acts else np.zeros(0, dtype=np.int16)
+        self.scenes = np.concatenate(scenes)[order] if scenes else np.zeros(0, dtype=np.int16)
+        self.players = np.concatenate(players)[order] if players else np.zeros(0, dtype=np.int32)
+
+        self.player_names = np.array([player.title() for player in player_ids])
+
+    def get_postings(self, word):
+        '''
+            Args:
+                word: The word to look for
+            Returns:
+                The act, scene and player id of every line
+                containing the word.
+        '''
+        term = self.vocabulary.get(word.strip().lower())
+        if term is None:
+            return self.acts[:0], self.scenes[:0], self.players[:0]
+
+        start, end = self.offsets[term], self.offsets[term + 1]
+        return self.acts[start:end], self.scenes[start:end], self.players[start:end]
+
+    def search(self, word):
+        '''
+            Counts, per act, the lines in which each player
+            says the given word.
+
+            Args:
+                word: The word to look for
+            Returns:
+                acts: The acts in which the word is said, sorted
+                players: The players who say the word, sorted by name
+                matrix: A NumPy array of shape (len(acts), len(players))
+        '''
+        acts, _, players = self.get_postings(word)
+
+        act_codes, act_values = pd.factorize(acts, sort=True)
+        player_codes, player_ids = pd.factorize(players)
+
+        order = np.argsort(self.player_names[player_ids], kind='stable')
+        position = np.empty(len(order), dtype=np.intp)
+        position[order] = np.arange(len(order))
+
+        matrix = np.zeros((len(act_values), len(player_ids)), dtype=np.int64)
+        np.add.at(matrix, (act_codes, position[player_codes]), 1)
+
+        return act_values, self.player_names[player_ids][order], matrix
@@ -0,0 +1,10 @@
+'''
+    Lets the tests import the modules of the app, as when it is
+    run from its 'src' folder.
+'''
+import os
+import sys
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src')
+
+sys.path.insert(0, SRC_DIR)
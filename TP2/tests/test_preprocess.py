@@ -0,0 +1,37 @@
+'''
+    Checks that the streaming summary matches the in-memory one.
+'''
+import os
+
+import pandas as pd
+import pandas.testing as tm
+
+import preprocess
+
+from conftest import SRC_DIR
+
+DATA_PATH = os.path.join(SRC_DIR, 'assets', 'data', 'romeo_and_juliet.csv')
+
+
+def test_summarize_lines_chunked_matches_summarize_lines():
+    expected = preprocess.summarize_lines(pd.read_csv(DATA_PATH))
+    result = preprocess.summarize_lines_chunked(DATA_PATH, chunksize=777)
+
+    tm.assert_frame_equal(result.reset_index(drop=True), expected.reset_index(drop=True),
+                          check_dtype=False, check_categorical=False)
+
+
+def test_summarize_lines_chunked_selects_each_play(tmp_path):
+    lines = pd.read_csv(DATA_PATH)
+    plays = pd.concat([lines.assign(Play='A'), lines.iloc[::3].assign(Play='B')])
+    path = tmp_path / 'plays.csv'
+    plays.to_csv(path, index=False)
+
+    result = preprocess.summarize_lines_chunked(path, chunksize=777)
+
+    for play in ('A', 'B'):
+        expected = preprocess.summarize_lines(plays[plays['Play'] == play])
+        tm.assert_frame_equal(preprocess.select_play(result, play).reset_index(drop=True),
+                              expected.reset_index(drop=True),
+                              check_dtype=False, check_categorical=False)
+    assert preprocess.get_plays(path, chunksize=777) == ['A', 'B']
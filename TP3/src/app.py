@@ -10,76 +10,248 @@
     This file is the entry point for our dash app.
 '''
 
-import dash
+import threading
+
+import flask
+
 import dash_html_components as html
 import dash_core_components as dcc
-from dash.dependencies import Input, Output
-
-import pandas as pd
+from dash.dependencies import ClientsideFunction, Input, Output, State
+from dash.exceptions import PreventUpdate
 
 import preprocess
 import heatmap
 import line_chart
 import template
+import serialization
+
+from columnar_cache import load_trees
+from figure_cache import LRUFigureCache
+from figure_store import FigureStore, get_key
+from lazy import LazyLoader
+from loading import DATA_PATH, get_complete_size
+from refresh import AppendRefresher
 
 
-app = dash.Dash(__name__)
+serialization.use_fast_json()
+
+app = serialization.CachedLayoutDash(__name__)
 app.title = 'TP3 | INF8808'
 
-dataframe = pd.read_csv('./assets/data/arbres.csv')
-
-dataframe = preprocess.convert_dates(dataframe)
-dataframe = preprocess.filter_years(dataframe, 2010, 2020)
-yearly_df = preprocess.summarize_yearly_counts(dataframe)
-data = preprocess.restructure_df(yearly_df)
-
-template.create_custom_theme()
-template.set_default_theme()
-
-app.layout = html.Div(className='content', children=[
-    html.Header(children=[
-        html.H1('Trees planted in Montreal neighborhoods'),
-        html.H2('From 2010 to 2020')
-    ]),
-    html.Main(className='viz-container', children=[
-        dcc.Graph(
-            id='heatmap',
-            className='graph',
-            figure=heatmap.get_figure(data),
-            config=dict(
-                scrollZoom=False,
-                showTips=False,
-                showAxisDragHandles=False,
-                doubleClick=False,
-                displayModeBar=False
-            )
-        ),
-        dcc.Graph(
-            id='line-chart',
-            className='graph',
-            figure=line_chart.get_empty_figure(),
-            config=dict(
-                scrollZoom=False,
-                showTips=False,
-                showAxisDragHandles=False,
-                doubleClick=False,
-                displayModeBar=False
-            )
-        )
+# When True, the .csv file is streamed in chunks and only the counts are
+# kept in memory, for inventories larger than the available memory
+STREAMING_INGEST = False
+
+# When True, the rows appended to the .csv file are folded into the counts
+# and pushed to the open pages every REFRESH_INTERVAL milliseconds
+INCREMENTAL_REFRESH = True
+REFRESH_INTERVAL = 60 * 1000
+
+# When True, the heatmap counts are sent as integers and the years as numbers
+COMPACT_HEATMAP = True
+
+# When True, the heatmap is sliced to the selected years in the browser,
+# from the year cube embedded in the page
+CLIENTSIDE_YEAR_RANGE = True
+
+# The years selected when the page is opened
+DEFAULT_YEARS = (2010, 2020)
+
+# When True, the line charts rendered by precompute.py are served from
+# the figure store, as long as it was built from the current .csv file
+PRECOMPUTED_FIGURES = True
+
+# When True, the data is loaded by the first request or by the warm-up
+# route instead of when the app is imported
+LAZY_LOADING = True
+
+line_figures = LRUFigureCache()
+heatmap_figures = LRUFigureCache(max_entries=64)
+
+# Guards the rebuild of the views when the counts change
+views_lock = threading.Lock()
+
+
+def get_views():
+    '''
+        Rebuilds the year cube and the rollups if the refresher
+        holds a newer version of the counts.
+
+        Returns:
+            version: The version of the counts in the views
+            cube: The year cube
+            rollups: The rollup of each granularity
+    '''
+    with views_lock:
+        version, yearly_counts, daily_counts = refresher.get_snapshot()
+        if version != views['version']:
+            views['cube'] = preprocess.build_year_cube(yearly_counts)
+            views['rollups'] = preprocess.build_rollups(daily_counts)
+            views['version'] = version
+
+        return views['version'], views['cube'], views['rollups']
+
+
+def get_cube_data(cube):
+    '''
+        Converts the year cube to the data embedded in the page
+        to slice the heatmap in the browser.
+
+        Args:
+            cube: The year cube
+        Returns:
+            The cube as a dictionary, with the labels of the
+            years as they appear on the heatmap's x axis.
+    '''
+    years = cube.years.tolist()
+    labels = years if COMPACT_HEATMAP else [str(year) + '-12-31' for year in years]
+
+    return dict(neighborhoods=cube.neighborhoods, years=years, labels=labels,
+                counts=cube.counts.tolist(), prefix=cube.prefix.tolist())
+
+
+def get_year_range(cube, year_range):
+    '''
+        Args:
+            cube: The year cube
+            year_range: The selected years, or None
+        Returns:
+            The first and last selected years, clipped to the
+            years of the cube.
+    '''
+    start, end = year_range or DEFAULT_YEARS
+    if len(cube.years):
+        start, end = max(start, cube.years[0]), min(end, cube.years[-1])
+
+    return int(start), int(end)
+
+
+def get_heatmap_figure(version, cube, start, end):
+    '''
+        Gets the heatmap of the given years, answered from the
+        year cube and kept in a cache.
+
+        Args:
+            version: The version of the counts in the cube
+            cube: The year cube
+            start: The starting year (inclusive)
+            end: The ending year (inclusive)
+        Returns:
+            The heatmap figure.
+    '''
+    return heatmap_figures.get_or_create(
+        (version, start, end),
+        lambda: heatmap.get_figure(preprocess.get_year_range(cube, start, end),
+                                   compact=COMPACT_HEATMAP))
+
+
+def get_slider_bounds(cube):
+    '''
+        Args:
+            cube: The year cube
+        Returns:
+            The first and last years of the cube, and the marks
+            of the year range slider between them.
+    '''
+    first_year, last_year = (int(cube.years[0]), int(cube.years[-1])) \
+        if len(cube.years) else DEFAULT_YEARS
+
+    return first_year, last_year, \
+        {year: str(year) for year in range(first_year, last_year + 1) if year % 5 == 0}
+
+
+def get_header(start, end):
+    '''
+        Args:
+            start: The starting year
+            end: The ending year
+        Returns:
+            The subtitle describing the selected years.
+    '''
+    return f'From {start} to {end}'
+
+
+def init_app_layout():
+    '''
+        Generates the HTML layout representing the app, showing
+        the default years of the latest counts.
+
+        Returns:
+            The HTML structure of the app's web page.
+    '''
+    version, cube, _ = get_views()
+    years = get_year_range(cube, None)
+    first_year, last_year, marks = get_slider_bounds(cube)
+
+    return html.Div(className='content', children=[
+        html.Header(children=[
+            html.H1('Trees planted in Montreal neighborhoods'),
+            html.H2(get_header(*years), id='year-header')
+        ]),
+        html.Main(className='viz-container', children=[
+            dcc.RangeSlider(
+                id='year-range',
+                min=first_year,
+                max=last_year,
+                step=1,
+                value=list(years),
+                allowCross=False,
+                marks=marks,
+                tooltip=dict(placement='bottom')
+            ),
+            dcc.Graph(
+                id='heatmap',
+                className='graph',
+                figure=get_heatmap_figure(version, cube, *years),
+                config=dict(
+                    scrollZoom=False,
+                    showTips=False,
+                    showAxisDragHandles=False,
+                    doubleClick=False,
+                    displayModeBar=False
+                )
+            ),
+            dcc.RadioItems(
+                id='granularity',
+                options=[
+                    dict(label=label, value=granularity)
+                    for granularity, label in preprocess.GRANULARITIES.items()
+                ],
+                value='day'
+            ),
+            dcc.Graph(
+                id='line-chart',
+                className='graph',
+                figure=line_chart.get_empty_figure(),
+                config=dict(
+                    scrollZoom=False,
+                    showTips=False,
+                    showAxisDragHandles=False,
+                    doubleClick=False,
+                    displayModeBar=False
+                )
+            ),
+            dcc.Interval(
+                id='refresh-interval',
+                interval=REFRESH_INTERVAL,
+                disabled=not INCREMENTAL_REFRESH
+            ),
+            dcc.Store(id='heatmap-version', data=version),
+            dcc.Store(id='year-cube', data=get_cube_data(cube) if CLIENTSIDE_YEAR_RANGE else None)
+        ])
     ])
-])
 
 
 @app.callback(
     Output('line-chart', 'figure'),
-    [Input('heatmap', 'clickData')]
+    [Input('heatmap', 'clickData'), Input('granularity', 'value')]
 )
-def heatmap_clicked(click_data):
+def heatmap_clicked(click_data, granularity='day'):
     '''
-        When a cell in the heatmap is clicked, updates the
-        line chart to show the data for the corresponding
-        neighborhood and year. If there is no data to show,
-        displays a message.
+        When a cell in the heatmap is clicked, or the granularity
+        changes, updates the line chart to show the data for the
+        corresponding neighborhood and year. If there is no data
+        to show, displays a message.
 
         Args:
             The necessary inputs and states to update the
@@ -96,11 +268,176 @@ def heatmap_clicked(click_data):
     arrond = click_data['points'][0]['y']
     year = click_data['points'][0]['x']
 
-    line_data = preprocess.get_daily_info(
-        dataframe,
-        arrond,
-        year)
+    def create_line_fig():
+        line_data = preprocess.get_period_info(
+            get_views()[2][granularity],
+            arrond,
+            year)
 
-    line_fig = line_chart.get_figure(line_data, arrond, year)
+        return line_chart.get_figure(line_data, arrond, year, granularity)
+
+    # The year is a number or a date string, depending on the heatmap encoding
+    key = (arrond, int(str(year)[0:4]), granularity)
+
+    line_fig = figure_store.get(get_key(*key)) if figure_store is not None else None
+    if line_fig is None:
+        line_fig = line_figures.get_or_create(key, create_line_fig)
 
     return line_fig
+
+
+@app.callback(
+    [Output('year-cube', 'data'), Output('heatmap-version', 'data'),
+     Output('year-range', 'min'), Output('year-range', 'max'), Output('year-range', 'marks')],
+    [Input('refresh-interval', 'n_intervals')],
+    [State('heatmap-version', 'data')]
+)
+def refresh_counts(n_intervals, shown_version):  # pylint: disable=unused-argument
+    '''
+        Periodically folds the rows appended to the .csv file into
+        the counts, then sends the updated year cube to the page if
+        it shows an older version of the counts. The bounds of the
+        year range slider follow the years of the counts.
+
+        Args:
+            n_intervals: The number of elapsed intervals
+            shown_version: The version of the counts shown by the page
+        Returns:
+            The updated year cube, if the heatmap is sliced in the
+            browser, the version of the counts it holds, and the
+            bounds and marks of the year range slider.
+    '''
+    for arrond, year in refresher.poll():
+        for granularity in preprocess.GRANULARITIES:
+            line_figures.invalidate((arrond, year, granularity))
+            if figure_store is not None:
+                figure_store.invalidate(get_key(arrond, year, granularity))
+
+    version, cube, _ = get_views()
+    if version == shown_version:
+        raise PreventUpdate
+
+    return (get_cube_data(cube) if CLIENTSIDE_YEAR_RANGE else None, version,
+            *get_slider_bounds(cube))
+
+
+def year_range_updated(year_range, shown_version):  # pylint: disable=unused-argument
+    '''
+        When the selected years or the counts change, updates the
+        heatmap from the year cube.
+
+        Args:
+            year_range: The selected years
+            shown_version: The version of the counts shown by the page
+        Returns:
+            The heatmap of the selected years and its subtitle.
+    '''
+    version, cube, _ = get_views()
+    start, end = get_year_range(cube, year_range)
+
+    return get_heatmap_figure(version, cube, start, end), get_header(start, end)
+
+
+if CLIENTSIDE_YEAR_RANGE:
+    # The heatmap is sliced in the browser, without a request to the server
+    app.clientside_callback(
+        ClientsideFunction(namespace='heatmap', function_name='slice_years'),
+        [Output('heatmap', 'figure'), Output('year-header', 'children')],
+        [Input('year-range', 'value'), Input('year-cube', 'data')],
+        [State('heatmap', 'figure')]
+    )
+else:
+    app.callback(
+        [Output('heatmap', 'figure'), Output('year-header', 'children')],
+        [Input('year-range', 'value'), Input('heatmap-version', 'data')]
+    )(year_range_updated)
+
+
+@app.server.route('/stats/line-chart-cache')
+def line_chart_cache_stats():
+    '''
+        Reports the counters of the line chart figure cache.
+
+        Returns:
+            The counters, as JSON.
+    '''
+    return flask.jsonify(line_figures.get_stats())
+
+
+@app.server.route('/figures/line-chart')
+def serve_stored_line_chart():
+    '''
+        Serves a line chart of the figure store as it is stored,
+        without decoding nor encoding it again. The neighborhood,
+        year and granularity are given in the query string.
+
+        Returns:
+            The encoded figure, or 404 if it is not stored
+            or no longer up to date.
+    '''
+    args = flask.request.args
+    encoded = None
+    if figure_store is not None and args.get('year', '').isdigit():
+        encoded = figure_store.get_bytes(
+            get_key(args.get('arrond'), int(args['year']), args.get('granularity', 'day')))
+    if encoded is None:
+        flask.abort(404)
+
+    return flask.Response(encoded, mimetype='application/json')
+
+
+def load_data(loader):
+    '''
+        Loads the whole history of the counts, then builds the
+        views answering the queries and the layout.
+
+        Args:
+            loader: The lazy loader timing each stage
+    '''
+    global refresher, views, figure_store  # pylint: disable=global-statement
+
+    # Only the complete lines written until now are read here, the rows
+    # appended after them are read by the refresher
+    offset = get_complete_size(DATA_PATH)
+
+    with loader.stage('counts'):
+        # The whole history is loaded, the year range is chosen on the page
+        if STREAMING_INGEST:
+            yearly_df, daily_index = preprocess.summarize_chunked(DATA_PATH, None, None,
+                                                                  size=offset)
+        else:
+            # The columns are read from the on-disk cache when the .csv file did not change
+            dataframe = load_trees(DATA_PATH, None, None, size=offset)
+
+            yearly_df = preprocess.summarize_yearly_counts(dataframe)
+            daily_index = preprocess.build_daily_index(dataframe)
+
+    refresher = AppendRefresher(DATA_PATH, None, None, yearly_df, daily_index, offset)
+
+    with loader.stage('views'):
+        views = dict(version=0, cube=preprocess.build_year_cube(yearly_df),
+                     rollups=preprocess.build_rollups(daily_index))
+
+    with loader.stage('figure_store'):
+        figure_store = FigureStore.open(DATA_PATH) if PRECOMPUTED_FIGURES else None
+
+    with loader.stage('template'):
+        template.create_custom_theme()
+        template.set_default_theme()
+
+    with loader.stage('layout'):
+        app.layout = init_app_layout()
+
+
+# Set by load_data. The views hold the latest year cube and rollups,
+# and the version of the counts they were built from.
+refresher = views = figure_store = None
+
+loader = LazyLoader(load_data)
+loader.init_server(app.server)
+
+if LAZY_LOADING:
+    # Replaced by the real layout once the data is loaded
+    app.layout = html.Div(className='content')
+else:
+    loader.ensure_loaded()
@@ -0,0 +1,44 @@
+window.dash_clientside = Object.assign({}, window.dash_clientside, {
+    heatmap: {
+        /*
+         * Slices the heatmap to the selected years using the year cube
+         * embedded in the page, without a request to the server. Only
+         * the neighborhoods with trees planted in those years are kept,
+         * which the prefix sums give without adding up the counts.
+         */
+        slice_years: function (yearRange, cube, figure) {
+            const years = cube.years;
+            if (!years.length) {
+                return [figure, 'From ' + yearRange[0] + ' to ' + yearRange[1]];
+            }
+            const start = Math.max(yearRange[0], years[0]);
+            const end = Math.min(yearRange[1], years[years.length - 1]);
+            const first = start - years[0];
+            const last = end - years[0] + 1;
+
+            const rows = [];
+            cube.prefix.forEach(function (prefix, i) {
+                if (prefix[last] - prefix[first] > 0) {
+                    rows.push(i);
+                }
+            });
+
+            const labels = cube.labels.slice(first, last);
+            const trace = Object.assign({}, figure.data[0], {
+                x: labels,
+                y: rows.map(function (i) { return cube.neighborhoods[i]; }),
+                z: rows.map(function (i) { return cube.counts[i].slice(first, last); })
+            });
+            const xaxis = Object.assign({}, figure.layout.xaxis, {
+                tickvals: labels,
+                ticktext: years.slice(first, last).map(String)
+            });
+            const layout = Object.assign({}, figure.layout, {xaxis: xaxis});
+
+            return [
+                Object.assign({}, figure, {data: [trace], layout: layout}),
+                'From ' + start + ' to ' + end
+            ];
+        }
+    }
+});
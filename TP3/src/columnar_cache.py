@@ -0,0 +1,202 @@
+'''
+    Contains the on-disk columnar cache of the tree dataset.
+
+    The first start parses the .csv file, then stores the typed,
+    date-parsed and year-filtered columns as NumPy files. The following
+    starts memory-map those files instead of parsing the text again, as
+    long as the source file and the year range did not change.
+'''
+import hashlib
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+import preprocess
+
+from loading import TREES_PROFILE, open_prefix, read_csv
+
+CACHE_DIR = './assets/cache'
+
+# Bumped whenever the layout of the stored files changes
+CACHE_VERSION = 1
+
+
+def hash_file(path, size=None, block_size=2**20):
+    '''
+        Args:
+            path: The path to the file to hash
+            size: The number of bytes to hash, or None to hash
+                the whole file
+            block_size: The number of bytes to read at a time
+        Returns:
+            The SHA-256 digest of the file's content.
+    '''
+    digest = hashlib.sha256()
+    with open_prefix(path, size) as source:
+        for block in iter(lambda: source.read(block_size), b''):
+            digest.update(block)
+
+    return digest.hexdigest()
+
+
+def is_valid(meta, path, start, end, size):
+    '''
+        Checks whether the stored columns were built from the
+        current source file and for the requested years.
+
+        The file is only hashed when its size matches but its
+        modification time does not, e.g. after being copied or
+        after rows were appended past the given size.
+
+        Args:
+            meta: The metadata of the stored columns
+            path: The path to the source .csv file
+            start: The first year kept
+            end: The last year kept
+            size: The number of bytes of the file to read
+        Returns:
+            True if the stored columns can be used.
+    '''
+    stat = os.stat(path)
+    if (meta.get('version'), meta.get('start'), meta.get('end'), meta.get('size')) != \
+            (CACHE_VERSION, start, end, size):
+        return False
+
+    if meta.get('mtime_ns') == stat.st_mtime_ns:
+        return True
+
+    return meta.get('sha256') == hash_file(path, size)
+
+
+def read_store(cache_dir, meta):
+    '''
+        Memory-maps the stored columns.
+
+        Args:
+            cache_dir: The folder holding the stored columns
+            meta: The metadata of the stored columns
+        Returns:
+            The tree dataframe.
+    '''
+    codes = np.load(os.path.join(cache_dir, meta['files']['codes']), mmap_mode='r')
+    dates = np.load(os.path.join(cache_dir, meta['files']['dates']), mmap_mode='r')
+
+    return pd.DataFrame({
+        'Arrond_Nom': pd.Categorical.from_codes(codes, meta['categories']),
+        'Date_Plantation': dates
+    })
+
+
+def write_meta(cache_dir, meta):
+    '''
+        Atomically replaces the metadata of the stored columns.
+
+        Args:
+            cache_dir: The folder holding the stored columns
+            meta: The metadata to write
+    '''
+    temporary = os.path.join(cache_dir, 'meta.json.' + str(os.getpid()))
+    with open(temporary, 'w', encoding='utf-8') as meta_file:
+        json.dump(meta, meta_file)
+    os.replace(temporary, os.path.join(cache_dir, 'meta.json'))
+
+
+def save_array(path, array):
+    '''
+        Atomically replaces a NumPy file. The array is saved under
+        a temporary name, then renamed, so a worker which mapped
+        the previous file keeps reading complete data.
+
+        Args:
+            path: The path of the .npy file
+            array: The array to save
+    '''
+    temporary = path + '.' + str(os.getpid())
+    with open(temporary, 'wb') as array_file:
+        np.save(array_file, array)
+    os.replace(temporary, path)
+
+
+def write_store(dataframe, cache_dir, meta):
+    '''
+        Stores the columns of the dataframe. Each file is renamed
+        into place once complete, and the metadata is written last
+        and atomically, so other workers never see it pointing to
+        incomplete files.
+
+        Args:
+            dataframe: The tree dataframe to store
+            cache_dir: The folder in which to store the columns
+            meta: The metadata describing the source file
+    '''
+    os.makedirs(cache_dir, exist_ok=True)
+
+    names = pd.Categorical(dataframe['Arrond_Nom'])
+    prefix = meta['sha256'][:16] + '-' + str(meta['start']) + '-' + str(meta['end'])
+    meta['categories'] = [str(name) for name in names.categories]
+    meta['files'] = dict(codes=prefix + '-codes.npy', dates=prefix + '-dates.npy')
+
+    save_array(os.path.join(cache_dir, meta['files']['codes']), names.codes)
+    save_array(os.path.join(cache_dir, meta['files']['dates']),
+               dataframe['Date_Plantation'].to_numpy(dtype='datetime64[ns]'))
+
+    write_meta(cache_dir, meta)
+
+    for name in os.listdir(cache_dir):
+        if name.endswith('.npy') and name not in meta['files'].values():
+            os.remove(os.path.join(cache_dir, name))
+
+
+def load_trees(path, start, end, cache_dir=CACHE_DIR, size=None):
+    '''
+        Loads the trees planted between the given years, from
+        the columnar cache when it is valid, or else from the
+        .csv file, then stores them in the cache.
+
+        Only the first bytes of the file are read when a size
+        is given, and the cache records that size, so the rows
+        appended later can be read from it.
+
+        Args:
+            path: The path to the source .csv file
+            start: The first year kept (inclusive)
+            end: The last year kept (inclusive)
+            cache_dir: The folder holding the cache
+            size: The number of bytes of the file to read, ending
+                on a line break, or None to read the whole file
+        Returns:
+            The tree dataframe, with a categorical 'Arrond_Nom'
+            column and a datetime 'Date_Plantation' column.
+    '''
+    if size is None:
+        size = os.path.getsize(path)
+
+    meta_path = os.path.join(cache_dir, 'meta.json')
+    if os.path.exists(meta_path):
+        # A missing, truncated or foreign stored file is rebuilt like a stale one
+        try:
+            with open(meta_path, encoding='utf-8') as meta_file:
+                meta = json.load(meta_file)
+            if is_valid(meta, path, start, end, size):
+                dataframe = read_store(cache_dir, meta)
+                mtime_ns = os.stat(path).st_mtime_ns
+                if meta['mtime_ns'] != mtime_ns:
+                    # Same content with a new time, no need to hash it next time
+                    meta['mtime_ns'] = mtime_ns
+                    write_meta(cache_dir, meta)
+                return dataframe
+        except (OSError, ValueError, KeyError):
+            pass
+
+    stat = os.stat(path)
+    meta = dict(version=CACHE_VERSION, start=start, end=end, size=size,
+                mtime_ns=stat.st_mtime_ns, sha256=hash_file(path, size))
+
+    with open_prefix(path, size) as source:
+        dataframe = read_csv(source, TREES_PROFILE)
+    dataframe = preprocess.filter_years(dataframe, start, end)
+    write_store(dataframe, cache_dir, meta)
+
+    return dataframe
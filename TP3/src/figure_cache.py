@@ -0,0 +1,121 @@
+'''
+    Contains the bounded LRU cache of the line chart figures.
+
+    The figures are kept frozen as dictionaries. When the cache holds
+    more entries or more bytes than allowed, the least recently used
+    figures are evicted. The size of a figure is estimated from its
+    arrays and strings, without encoding it. The cache can be shared
+    by the threads of the server.
+'''
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from serialization import freeze_figure
+
+MAX_ENTRIES = 256
+MAX_BYTES = 32 * 2**20
+
+
+def get_size(value):
+    '''
+        Estimates the memory held by a frozen figure.
+
+        Args:
+            value: The figure, or one of its values
+        Returns:
+            The number of bytes of its arrays and strings, with
+            8 bytes for any other value.
+    '''
+    if isinstance(value, dict):
+        return sum(len(key) + get_size(item) for key, item in value.items())
+    if isinstance(value, (list, tuple)):
+        return sum(get_size(item) for item in value)
+    if isinstance(value, np.ndarray):
+        if value.dtype == object:
+            return sum(get_size(item) for item in value.ravel())
+        return value.nbytes
+    if isinstance(value, str):
+        return len(value)
+    return 8
+
+
+class LRUFigureCache:
+    '''
+        A thread-safe LRU cache of figures, bounded in entries and bytes.
+    '''
+
+    def __init__(self, max_entries=MAX_ENTRIES, max_bytes=MAX_BYTES):
+        '''
+            Args:
+                max_entries: The maximum number of figures kept
+                max_bytes: The maximum total size of the kept
+                    figures, as estimated by 'get_size'
+        '''
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get_or_create(self, key, create):
+        '''
+            Gets the figure for the given key, creating it and
+            keeping it on a miss. The figure is created outside
+            the lock, so a slow creation does not block hits.
+
+            Args:
+                key: The key of the figure
+                create: A function without arguments returning the figure
+            Returns:
+                The figure, frozen as a dictionary.
+        '''
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return self.entries[key][0]
+            self.misses += 1
+
+        figure = freeze_figure(create())
+        size = get_size(figure)
+
+        with self.lock:
+            if key in self.entries:
+                self.total_bytes -= self.entries.pop(key)[1]
+            if size <= self.max_bytes and self.max_entries > 0:
+                self.entries[key] = (figure, size)
+                self.total_bytes += size
+                while len(self.entries) > self.max_entries or self.total_bytes > self.max_bytes:
+                    self.total_bytes -= self.entries.popitem(last=False)[1][1]
+                    self.evictions += 1
+
+        return figure
+
+    def invalidate(self, key=None):
+        '''
+            Removes the figure for the given key, or every figure.
+
+            Args:
+                key: The key of the figure to remove, or None
+        '''
+        with self.lock:
+            if key is None:
+                self.entries.clear()
+                self.total_bytes = 0
+            elif key in self.entries:
+                self.total_bytes -= self.entries.pop(key)[1]
+
+    def get_stats(self):
+        '''
+            Returns:
+                The hit, miss and eviction counters, as well as
+                the current number of entries and bytes.
+        '''
+        with self.lock:
+            return dict(hits=self.hits, misses=self.misses, evictions=self.evictions,
+                        entries=len(self.entries), bytes=self.total_bytes)
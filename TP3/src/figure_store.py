@@ -0,0 +1,200 @@
+'''
+    Contains the on-disk store of the precomputed line chart figures.
+
+    The figures of every heatmap cell are rendered ahead of time by
+    precompute.py and written one after the other, already encoded, to a
+    single file. An index maps each (neighborhood, year, granularity) to
+    the position of its figure in that file. The server memory-maps the
+    file, so serving a stored figure is a read and a decoding.
+
+    Each build writes its figures to a new file, named by the index. The
+    index is replaced last, so a single rename publishes both together.
+'''
+import glob
+import json
+import mmap
+import os
+import time
+
+try:
+    from orjson import loads
+except ImportError:
+    from json import loads
+
+from columnar_cache import hash_file
+
+STORE_DIR = './assets/figure_store'
+
+# Bumped whenever the layout of the store changes
+STORE_VERSION = 2
+
+
+def get_key(arrond, year, granularity):
+    '''
+        Args:
+            arrond: The neighborhood
+            year: The year, as a number
+            granularity: The granularity of the line chart
+        Returns:
+            The key of the figure in the store's index.
+    '''
+    return f'{arrond}|{year}|{granularity}'
+
+
+def get_signature(path):
+    '''
+        Args:
+            path: The path to the source .csv file
+        Returns:
+            The size, modification time and SHA-256 digest
+            of the source file.
+    '''
+    stat = os.stat(path)
+
+    return dict(size=stat.st_size, mtime_ns=stat.st_mtime_ns, sha256=hash_file(path))
+
+
+def write_store(figures, source, store_dir=STORE_DIR):
+    '''
+        Writes the encoded figures to a new file, then publishes
+        it with its index by replacing the index atomically. A
+        server never reads an index pointing to an incomplete or
+        to another build's file.
+
+        The files of the previous builds are removed afterwards.
+        A server which already opened one keeps its mapping.
+
+        Args:
+            figures: The (key, encoded figure) pairs to store
+            source: The signature of the source .csv file
+            store_dir: The folder in which to write the store
+        Returns:
+            The number of figures stored.
+    '''
+    os.makedirs(store_dir, exist_ok=True)
+    build = f'{time.time_ns():x}-{os.getpid()}'
+    data_name = f'figures-{build}.bin'
+
+    offsets = {}
+    position = 0
+    with open(os.path.join(store_dir, data_name), 'wb') as data_file:
+        for key, encoded in figures:
+            data_file.write(encoded)
+            offsets[key] = (position, len(encoded))
+            position += len(encoded)
+        data_file.flush()
+        os.fsync(data_file.fileno())
+
+    index = dict(version=STORE_VERSION, source=source, data_file=data_name, offsets=offsets)
+    index_path = os.path.join(store_dir, 'index.json')
+    with open(index_path + '.' + build, 'w', encoding='utf-8') as index_file:
+        json.dump(index, index_file)
+    os.replace(index_path + '.' + build, index_path)
+
+    for path in glob.glob(os.path.join(store_dir, 'figures*.bin')):
+        if os.path.basename(path) != data_name:
+            os.remove(path)
+
+    return len(offsets)
+
+
+class FigureStore:
+    '''
+        A read-only view of the stored figures, memory-mapped.
+    '''
+
+    def __init__(self, data, offsets):
+        '''
+            Args:
+                data: The memory-mapped figures
+                offsets: The position and length of each figure
+        '''
+        self.data = data
+        self.offsets = offsets
+        self.stale = set()
+
+    @classmethod
+    def open(cls, path, store_dir=STORE_DIR):
+        '''
+            Opens the store, if it was built from the current
+            source file.
+
+            The file is only hashed when its size matches but its
+            modification time does not, e.g. after being copied.
+
+            Args:
+                path: The path to the source .csv file
+                store_dir: The folder holding the store
+            Returns:
+                The store, or None if it is missing or stale.
+        '''
+        index_path = os.path.join(store_dir, 'index.json')
+        data_name = None
+        while True:
+            if not os.path.exists(index_path):
+                return None
+
+            with open(index_path, encoding='utf-8') as index_file:
+                index = json.load(index_file)
+
+            stat = os.stat(path)
+            source = index.get('source', {})
+            if index.get('version') != STORE_VERSION or source.get('size') != stat.st_size:
+                return None
+            if source.get('mtime_ns') != stat.st_mtime_ns \
+                    and source.get('sha256') != hash_file(path):
+                return None
+
+            try:
+                data_file = open(os.path.join(store_dir, index['data_file']), 'rb')
+            except FileNotFoundError:
+                # A newer build was published since the index was read
+                if index['data_file'] == data_name:
+                    return None
+                data_name = index['data_file']
+                continue
+            break
+
+        with data_file:
+            if not os.fstat(data_file.fileno()).st_size:
+                return cls(b'', {})
+            data = mmap.mmap(data_file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        return cls(data, {key: tuple(value) for key, value in index['offsets'].items()})
+
+    def get_bytes(self, key):
+        '''
+            Args:
+                key: The key of the figure, as given by 'get_key'
+            Returns:
+                The figure, encoded as stored, or None if it is not
+                stored or no longer up to date.
+        '''
+        if key in self.stale or key not in self.offsets:
+            return None
+
+        start, length = self.offsets[key]
+
+        return self.data[start:start + length]
+
+    def get(self, key):
+        '''
+            Args:
+                key: The key of the figure, as given by 'get_key'
+            Returns:
+                The figure as a dictionary, or None if it is not
+                stored or no longer up to date.
+        '''
+        encoded = self.get_bytes(key)
+
+        return None if encoded is None else loads(encoded)
+
+    def invalidate(self, key):
+        '''
+            Stops serving the stored figure for the given key,
+            after its data changed.
+
+            Args:
+                key: The key of the figure, as given by 'get_key'
+        '''
+        self.stale.add(key)
@@ -1,12 +1,36 @@
 '''
     Contains some functions related to the creation of the heatmap.
 '''
+import numpy as np
+import pandas as pd
 import plotly.express as px
 import plotly.io as pio
 import hover_template
 
 
-def get_figure(data):
+def to_compact(data):
+    '''
+        Converts the restructured data to its compact form : the
+        counts become integers of the smallest fitting type and
+        the columns become the years as integers.
+
+        The plotly.js version bundled with Dash 2.6 cannot decode
+        base64 typed arrays, so the gain comes from sending short
+        integers instead of floats and dates.
+
+        Args:
+            data: The data returned by 'preprocess.restructure_df'
+        Returns:
+            The compact data.
+    '''
+    counts = data.to_numpy()
+    dtype = np.min_scalar_type(int(counts.max())) if counts.size else np.uint8
+
+    return pd.DataFrame(counts.astype(dtype), index=data.index,
+                        columns=data.columns.str.slice(0, 4).astype(int))
+
+
+def get_figure(data, compact=False):
     '''
         Generates the heatmap from the given dataset.
 
@@ -16,9 +40,16 @@ def get_figure(data):
 
         Args:
             data: The data to display
+            compact: Whether to send the counts as integers
+                and the years as numbers
         Returns:
             The figure to be displayed.
     '''
+    if compact:
+        data = to_compact(data)
+        years = data.columns
+    else:
+        years = data.columns.str.slice(0, 4)
 
     fig = px.imshow(data)
     fig.update_layout(
@@ -31,7 +62,7 @@ def get_figure(data):
         xaxis = dict(
             tickmode = 'array',
             tickvals = data.columns,
-            ticktext = data.columns.str.slice(0, 4) # Display only the year
+            ticktext = years.astype(str) # Display only the year
         )
     )
     
@@ -0,0 +1,164 @@
+'''
+    Contains the lazy loading of the data behind the app.
+
+    When the app is lazy, importing it only creates the Dash app. The
+    data is read and the figures are built by the first request, or by
+    an explicit warm-up, so the server can answer health checks while it
+    starts. The readiness route reports whether the data is loaded, along
+    with the time taken by each stage of the loading. It also starts the
+    loading in the background, so a readiness probe alone is enough for
+    the app to become ready.
+'''
+import threading
+import time
+from contextlib import contextmanager
+
+import flask
+
+READY_ROUTE = '/ready'
+WARMUP_ROUTE = '/warmup'
+
+
+class LazyLoader:
+    '''
+        Runs the loading function of the app once, on demand,
+        and records the time taken by each of its stages.
+    '''
+
+    def __init__(self, load):
+        '''
+            Args:
+                load: The function loading the data, which takes
+                    this loader to time its stages
+        '''
+        self.load = load
+        self.lock = threading.Lock()
+        self.ready = False
+        self.error = None
+        self.timings = {}
+        # Guards the start of the background loading, apart from the
+        # loading itself so the readiness route never waits for it
+        self.thread_lock = threading.Lock()
+        self.thread = None
+
+    @contextmanager
+    def stage(self, name):
+        '''
+            Times the stage of the loading run in the block.
+
+            Args:
+                name: The name of the stage
+        '''
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[name] = time.perf_counter() - start
+
+    def ensure_loaded(self):
+        '''
+            Loads the data unless it is already loaded. Concurrent
+            calls wait for the same loading. A failed loading is
+            tried again by the next call.
+        '''
+        if self.ready:
+            return
+
+        with self.lock:
+            if self.ready:
+                return
+
+            self.timings = {}
+            self.error = None
+            try:
+                with self.stage('total'):
+                    self.load(self)
+            except Exception as error:
+                self.error = repr(error)
+                raise
+
+            self.ready = True
+
+    def load_in_background(self):
+        '''
+            Loads the data, keeping the error of a failed
+            loading for the status instead of raising it.
+        '''
+        try:
+            self.ensure_loaded()
+        except Exception:  # pylint: disable=broad-except
+            pass
+
+    def start_loading(self):
+        '''
+            Starts loading the data in a background thread, unless
+            it is loaded or already loading.
+        '''
+        if self.ready:
+            return
+
+        with self.thread_lock:
+            if self.ready or (self.thread is not None and self.thread.is_alive()):
+                return
+            self.thread = threading.Thread(target=self.load_in_background,
+                                           name='lazy-loader', daemon=True)
+            self.thread.start()
+
+    def get_status(self):
+        '''
+            Returns:
+                Whether the data is loaded, the error of the last
+                loading if it failed, and the time taken by each
+                stage, in milliseconds.
+        '''
+        return dict(ready=self.ready, error=self.error,
+                    timings_ms={name: round(seconds * 1000, 3)
+                                for name, seconds in self.timings.items()})
+
+    def before_request(self):
+        '''
+            Loads the data before any request other than the
+            readiness and warm-up ones.
+        '''
+        if flask.request.path not in (READY_ROUTE, WARMUP_ROUTE):
+            self.ensure_loaded()
+
+    def serve_ready(self):
+        '''
+            Starts loading the data if needed, without waiting.
+
+            Returns:
+                The status, with code 200 once the data is
+                loaded and 503 before.
+        '''
+        self.start_loading()
+
+        return flask.jsonify(self.get_status()), 200 if self.ready else 503
+
+    def serve_warmup(self):
+        '''
+            Loads the data if needed.
+
+            Returns:
+                The status, with code 200 once the data is
+                loaded and 500 if the loading failed.
+        '''
+        try:
+            self.ensure_loaded()
+        except Exception:  # pylint: disable=broad-except
+            return flask.jsonify(self.get_status()), 500
+
+        return flask.jsonify(self.get_status())
+
+    def init_server(self, server):
+        '''
+            Adds the readiness and warm-up routes to the server,
+            and makes any other request wait for the data.
+
+            Args:
+                server: The Flask server of the app
+        '''
+        server.before_request(self.before_request)
+        server.add_url_rule(READY_ROUTE, 'lazy_ready', self.serve_ready)
+        server.add_url_rule(WARMUP_ROUTE, 'lazy_warmup', self.serve_warmup,
+                            methods=['GET', 'POST'])
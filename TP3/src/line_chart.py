@@ -51,7 +51,11 @@ def add_rectangle_shape(fig):
     return fig
 
 
-def get_figure(line_data, arrond, year):
+# The format of the ticks for each granularity
+TICK_FORMATS = dict(day='%d %b', week='%d %b', month='%b')
+
+
+def get_figure(line_data, arrond, year, granularity='day'):
     '''
         Generates the line chart using the given data.
 
@@ -69,6 +73,8 @@ def get_figure(line_data, arrond, year):
             line chart
             arrond: The selected neighborhood
             year: The selected year
+            granularity: The period of each point, 'day',
+                'week' or 'month'
         Returns:
             The figure to be displayed
     '''
@@ -76,11 +82,11 @@ def get_figure(line_data, arrond, year):
     fig.update_layout(
         xaxis_title='',
         yaxis_title='Trees',
-        title = f'Trees planted in {arrond} in {year[0:4]}',    # Display the year only
+        title = f'Trees planted in {arrond} in {str(year)[0:4]}',    # Display the year only
     )
 
     fig.update_traces(hovertemplate = hover_template.get_linechart_hover_template())
-    fig.update_xaxes(tickformat='%d %b')
+    fig.update_xaxes(tickformat=TICK_FORMATS[granularity])
 
     if len(line_data) == 1:
         fig.update_traces(mode='markers')
@@ -0,0 +1,188 @@
+'''
+    Contains the loading profile used to read the .csv file with compact
+    types, and a report of the memory it saves.
+'''
+import io
+import os
+
+import pandas as pd
+
+DATA_PATH = './assets/data/arbres.csv'
+
+
+def parse_plantation_dates(dates):
+    '''
+        Parses the plantation dates while the file is read.
+
+        Args:
+            dates: The array of date strings to parse
+        Returns:
+            The parsed dates.
+    '''
+    return pd.to_datetime(dates, format='%Y/%m/%d')
+
+
+# Only the columns used by the app are read, with categorical
+# neighborhood names and the dates parsed during the read
+TREES_PROFILE = dict(
+    usecols=['Arrond_Nom', 'Date_Plantation'],
+    dtype={'Arrond_Nom': 'category'},
+    parse_dates=['Date_Plantation'],
+    date_parser=parse_plantation_dates,
+)
+
+
+def downcast_columns(dataframe, downcast):
+    '''
+        Converts the given columns to the smallest numeric type
+        holding their values, once they are parsed, so no value
+        is ever wrapped around.
+
+        Args:
+            dataframe: The dataframe, or a chunk of it
+            downcast: The kind of numeric type of each column,
+                as accepted by pd.to_numeric
+        Returns:
+            The dataframe with the converted columns.
+    '''
+    for col, kind in downcast.items():
+        dataframe[col] = pd.to_numeric(dataframe[col], downcast=kind)
+
+    return dataframe
+
+
+def read_csv(path, profile, columns=None, **kwargs):
+    '''
+        Reads the .csv file using the given loading profile.
+
+        Args:
+            path: The path to the .csv file
+            profile: The loading profile, holding the 'usecols' and
+                the 'dtype', 'downcast', 'parse_dates' and
+                'date_parser' to use when reading
+            columns: The columns to read among the profile's, or
+                None to read all of them
+            kwargs: Other arguments for pd.read_csv, e.g. 'chunksize'
+        Returns:
+            The dataframe, or an iterator over its chunks.
+    '''
+    usecols = list(columns) if columns is not None else profile['usecols']
+    dtype = {col: kind for col, kind in profile.get('dtype', {}).items() if col in usecols}
+    downcast = {col: kind for col, kind in profile.get('downcast', {}).items() if col in usecols}
+    parse_dates = [col for col in profile.get('parse_dates', []) if col in usecols]
+    if parse_dates:
+        kwargs.update(parse_dates=parse_dates, date_parser=profile.get('date_parser'))
+
+    dataframe = pd.read_csv(path, usecols=usecols, dtype=dtype, **kwargs)
+    if not downcast:
+        return dataframe
+    if kwargs.get('chunksize') is not None or kwargs.get('iterator'):
+        return (downcast_columns(chunk, downcast) for chunk in dataframe)
+
+    return downcast_columns(dataframe, downcast)
+
+
+def get_complete_size(path, block_size=2**16):
+    '''
+        Args:
+            path: The path to the .csv file
+            block_size: The number of bytes to read at a time,
+                from the end of the file
+        Returns:
+            The number of bytes of the file up to its last line
+            break, leaving out a line still being written.
+    '''
+    with open(path, 'rb') as source:
+        end = source.seek(0, os.SEEK_END)
+        while end > 0:
+            start = max(0, end - block_size)
+            source.seek(start)
+            found = source.read(end - start).rfind(b'\n')
+            if found >= 0:
+                return start + found + 1
+            end = start
+
+    return 0
+
+
+class PrefixReader(io.RawIOBase):
+    '''
+        A binary file which ends after its first bytes, so the rows
+        appended after them are not read.
+    '''
+
+    def __init__(self, path, size):
+        '''
+            Args:
+                path: The path to the file
+                size: The number of bytes to read
+        '''
+        super().__init__()
+        self.source = open(path, 'rb')  # pylint: disable=consider-using-with
+        self.remaining = size
+
+    def readable(self):
+        '''
+            Returns:
+                True, the file can be read.
+        '''
+        return True
+
+    def readinto(self, buffer):
+        '''
+            Reads into the buffer, up to the end of the first bytes.
+
+            Args:
+                buffer: The writable buffer to fill
+            Returns:
+                The number of bytes read, 0 at the end.
+        '''
+        count = self.source.readinto(memoryview(buffer)[:self.remaining])
+        self.remaining -= count
+        return count
+
+    def close(self):
+        '''
+            Closes the underlying file.
+        '''
+        self.source.close()
+        super().close()
+
+
+def open_prefix(path, size=None):
+    '''
+        Args:
+            path: The path to the file
+            size: The number of bytes to read, or None to read
+                the whole file
+        Returns:
+            The opened binary file.
+    '''
+    if size is None:
+        return open(path, 'rb')  # pylint: disable=consider-using-with
+
+    return io.BufferedReader(PrefixReader(path, size))
+
+
+def get_memory_report(path, profile):
+    '''
+        Measures the memory used by the .csv file once loaded with
+        pandas' default types and once loaded with the profile.
+
+        Args:
+            path: The path to the .csv file
+            profile: The loading profile
+        Returns:
+            The number of bytes used before and after applying
+            the profile.
+    '''
+    before = pd.read_csv(path).memory_usage(deep=True).sum()
+    after = read_csv(path, profile).memory_usage(deep=True).sum()
+
+    return dict(before=int(before), after=int(after))
+
+
+if __name__ == '__main__':
+    report = get_memory_report(DATA_PATH, TREES_PROFILE)
+    print(f"Before : {report['before'] / 2**20:.2f} MiB")
+    print(f"After : {report['after'] / 2**20:.2f} MiB")
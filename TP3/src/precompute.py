@@ -0,0 +1,112 @@
+'''
+    Renders the line chart figure of every non-empty heatmap cell, at
+    every granularity, and writes them to the figure store served by the
+    app. The figures are rendered in parallel by a pool of processes.
+    Run from this folder, for example :
+
+        python precompute.py --workers 4
+'''
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import line_chart
+import preprocess
+import serialization
+import template
+
+from columnar_cache import load_trees
+from figure_store import STORE_DIR, get_key, get_signature, write_store
+from loading import DATA_PATH
+
+# Number of figures rendered by a worker per task
+TASK_SIZE = 64
+
+# The rollups of the process, set by 'init_worker'
+worker_rollups = {}
+
+
+def init_worker(rollups):
+    '''
+        Prepares a worker process to render figures.
+
+        Args:
+            rollups: The rollup of each granularity
+    '''
+    worker_rollups.update(rollups)
+    template.create_custom_theme()
+    template.set_default_theme()
+    serialization.use_fast_json()
+
+
+def render(cells):
+    '''
+        Renders the line charts of the given cells, exactly
+        like the app does when a cell is clicked.
+
+        Args:
+            cells: The (neighborhood, year, granularity) triples
+        Returns:
+            The (key, encoded figure) pairs.
+    '''
+    rendered = []
+    for arrond, year, granularity in cells:
+        line_data = preprocess.get_period_info(worker_rollups[granularity], arrond, year)
+        fig = line_chart.get_figure(line_data, arrond, year, granularity)
+        rendered.append((get_key(arrond, year, granularity),
+                         serialization.to_json_bytes(serialization.freeze_figure(fig))))
+
+    return rendered
+
+
+def get_cells(year_cube):
+    '''
+        Args:
+            year_cube: The cube built by 'preprocess.build_year_cube'
+        Returns:
+            The (neighborhood, year, granularity) triples of every
+            non-empty heatmap cell.
+    '''
+    rows, columns = np.nonzero(year_cube.counts)
+
+    return [(year_cube.neighborhoods[row], int(year_cube.years[column]), granularity)
+            for row, column in zip(rows, columns)
+            for granularity in preprocess.GRANULARITIES]
+
+
+def main():
+    '''
+        Parses the command line, renders the figures and
+        writes the store.
+    '''
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0].strip())
+    parser.add_argument('--workers', type=int, default=os.cpu_count(),
+                        help='The number of processes rendering figures')
+    parser.add_argument('--output', default=STORE_DIR,
+                        help='The folder in which to write the store')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+
+    # The signature is taken first, so rows appended while rendering make the store stale
+    source = get_signature(DATA_PATH)
+    dataframe = load_trees(DATA_PATH, None, None)
+    year_cube = preprocess.build_year_cube(preprocess.summarize_yearly_counts(dataframe))
+    rollups = preprocess.build_rollups(preprocess.build_daily_index(dataframe))
+
+    cells = get_cells(year_cube)
+    tasks = [cells[i:i + TASK_SIZE] for i in range(0, len(cells), TASK_SIZE)]
+
+    with ProcessPoolExecutor(max_workers=args.workers, initializer=init_worker,
+                             initargs=(rollups,)) as executor:
+        figures = [pair for rendered in executor.map(render, tasks) for pair in rendered]
+
+    count = write_store(figures, source, args.output)
+    print(f'{count} figures written to {args.output} in {time.perf_counter() - start:.2f} s')
+
+
+if __name__ == '__main__':
+    main()
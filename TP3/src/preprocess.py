@@ -1,8 +1,31 @@
 '''
     Contains some functions to preprocess the data used in the visualisation.
 '''
+from collections import namedtuple
+
+import numpy as np
 import pandas as pd
 
+from loading import TREES_PROFILE, open_prefix, read_csv
+
+# The daily tree counts, with one row per neighborhood and one column
+# per day since 'start'
+DailyIndex = namedtuple('DailyIndex', ['neighborhoods', 'start', 'counts'])
+
+# The yearly tree counts, with one row per neighborhood and one column per
+# year, and their prefix sums along the years
+YearCube = namedtuple('YearCube', ['neighborhoods', 'years', 'counts', 'prefix'])
+
+# The tree counts of a neighborhood per period, with one column per
+# period starting on the day at the same position in 'starts'
+Rollup = namedtuple('Rollup', ['neighborhoods', 'starts', 'counts'])
+
+# The granularities of the line chart and the label of each
+GRANULARITIES = dict(day='Day', week='Week', month='Month')
+
+# Number of rows read at a time when streaming the .csv file
+CHUNK_SIZE = 100000
+
 
 def convert_dates(dataframe):
     '''
@@ -26,13 +49,22 @@ def filter_years(dataframe, start, end):
 
         Args:
             dataframe: The dataframe to process
-            start: The starting year (inclusive)
-            end: The ending year (inclusive)
+            start: The starting year (inclusive), or None
+                to keep every year before the ending one
+            end: The ending year (inclusive), or None
+                to keep every year after the starting one
         Returns:
             The dataframe filtered by date.
     '''
+    years = dataframe['Date_Plantation'].dt.year
 
-    dataframe = dataframe[(dataframe['Date_Plantation'].dt.year >= start) & (dataframe['Date_Plantation'].dt.year <= end)]
+    kept = years.notna()
+    if start is not None:
+        kept &= years >= start
+    if end is not None:
+        kept &= years <= end
+
+    dataframe = dataframe[kept]
 
     return dataframe
 
@@ -51,7 +83,9 @@ def summarize_yearly_counts(dataframe):
             trees for each neighborhood each year.
     '''
 
-    yearly_df = dataframe.groupby(['Arrond_Nom', pd.DatetimeIndex(dataframe['Date_Plantation']).year]).size().reset_index(name='Counts')
+    years = pd.DatetimeIndex(dataframe['Date_Plantation']).year
+    yearly_df = dataframe.groupby(['Arrond_Nom', years], observed=True).size() \
+        .reset_index(name='Counts')
 
     return yearly_df
 
@@ -87,25 +121,270 @@ def restructure_df(yearly_df):
     return data
 
 
-def get_daily_info(dataframe, arrond, year):
+def build_year_cube(yearly_df):
+    '''
+        Stores the yearly counts in a dense matrix with one row per
+        neighborhood and one column per year, from the first to the
+        last year with a plantation, along with its prefix sums.
+
+        Args:
+            yearly_df: The yearly counts, as returned by
+                'summarize_yearly_counts'
+        Returns:
+            The year cube.
+    '''
+    neighborhoods, rows = np.unique(yearly_df['Arrond_Nom'].astype(str).to_numpy(),
+                                    return_inverse=True)
+    years = yearly_df['Date_Plantation'].to_numpy(dtype=np.int64)
+
+    first = int(years.min()) if len(years) else 0
+    n_years = int(years.max()) - first + 1 if len(years) else 0
+
+    counts = np.zeros((len(neighborhoods), n_years), dtype=np.int64)
+    np.add.at(counts, (rows, years - first), yearly_df['Counts'].to_numpy(dtype=np.int64))
+
+    prefix = np.zeros((len(neighborhoods), n_years + 1), dtype=np.int64)
+    np.cumsum(counts, axis=1, out=prefix[:, 1:])
+
+    return YearCube(list(neighborhoods), np.arange(first, first + n_years), counts, prefix)
+
+
+def get_year_range(year_cube, start, end):
+    '''
+        Answers a year range from the year cube, in the format
+        returned by 'restructure_df'. Only the neighborhoods with
+        trees planted in the range are kept, which the prefix sums
+        give without adding up the counts.
+
+        Args:
+            year_cube: The cube built by 'build_year_cube'
+            start: The starting year (inclusive)
+            end: The ending year (inclusive)
+        Returns:
+            The counts of the neighborhoods in the given years.
+    '''
+    first = int(np.searchsorted(year_cube.years, start))
+    last = int(np.searchsorted(year_cube.years, end, side='right'))
+
+    rows = np.flatnonzero(year_cube.prefix[:, last] - year_cube.prefix[:, first])
+
+    return pd.DataFrame(
+        year_cube.counts[rows, first:last],
+        index=pd.Index(np.asarray(year_cube.neighborhoods, dtype=object)[rows], name='Arrond_Nom'),
+        columns=[str(year) + '-12-31' for year in year_cube.years[first:last]]
+    )
+
+
+def build_daily_index(dataframe):
     '''
-        From the given dataframe, gets
-        the daily amount of planted trees
-        in the given neighborhood and year.
+        Counts the trees planted in each neighborhood each day,
+        in one vectorized pass over the dataframe.
+
+        The counts are stored in a dense matrix with one row per
+        neighborhood and one column per day, from the first to the
+        last day with a plantation.
 
         Args:
             dataframe: The dataframe to process
+        Returns:
+            The daily index, holding the row of each neighborhood,
+            the first day and the matrix of counts.
+    '''
+    codes, names = pd.factorize(dataframe['Arrond_Nom'])
+    dates = dataframe['Date_Plantation'].to_numpy(dtype='datetime64[D]')
+
+    valid = (codes >= 0) & ~np.isnat(dates)
+    codes, dates = codes[valid], dates[valid]
+
+    start = dates.min() if len(dates) else np.datetime64('1970-01-01')
+    days = (dates - start).astype(np.int64)
+    n_days = int(days.max()) + 1 if len(days) else 0
+
+    counts = np.bincount(codes * n_days + days, minlength=len(names) * n_days)
+    counts = counts.reshape(len(names), n_days).astype(np.int32)
+
+    return DailyIndex({name: row for row, name in enumerate(names)}, start, counts)
+
+
+def get_period_starts(days, granularity):
+    '''
+        Finds which days start a period of the given granularity.
+        Weeks start on Mondays and on January 1st, so no week
+        spans two years.
+
+        Args:
+            days: The consecutive days, as datetime64[D]
+            granularity: 'day', 'week' or 'month'
+        Returns:
+            The positions of the days starting a period.
+    '''
+    if granularity == 'day' or not len(days):
+        return np.arange(len(days))
+
+    first_days = days.astype('datetime64[M]' if granularity == 'month' else 'datetime64[Y]')
+    starts = days == first_days.astype('datetime64[D]')
+    if granularity == 'week':
+        # 1970-01-01 was a Thursday
+        starts |= (days.astype(np.int64) + 3) % 7 == 0
+    starts[0] = True
+
+    return np.flatnonzero(starts)
+
+
+def build_rollups(daily_index):
+    '''
+        Sums the daily counts per day, week and month, once,
+        so switching the granularity of the line chart is a
+        lookup.
+
+        Args:
+            daily_index: The index built by 'build_daily_index'
+        Returns:
+            The rollup of each granularity.
+    '''
+    days = daily_index.start + np.arange(daily_index.counts.shape[1])
+
+    rollups = {}
+    for granularity in GRANULARITIES:
+        starts = get_period_starts(days, granularity)
+        if granularity == 'day' or not len(starts):
+            counts = daily_index.counts
+        else:
+            counts = np.add.reduceat(daily_index.counts, starts, axis=1)
+        rollups[granularity] = Rollup(daily_index.neighborhoods, days[starts], counts)
+
+    return rollups
+
+
+def get_period_info(rollup, arrond, year):
+    '''
+        From the given rollup, gets the amount of planted
+        trees per period in the given neighborhood and year.
+
+        Args:
+            rollup: One of the rollups built by 'build_rollups'
             arrond: The desired neighborhood
-            year: The desired year
+            year: The desired year, as a number or
+                a date string
+        Returns:
+            The tree count data per period for that
+            neighborhood and year, from its first to
+            its last period with a plantation. The
+            periods are dated by their first day.
+    '''
+    year = int(str(year)[0:4])
+    row = rollup.neighborhoods.get(arrond)
+
+    first = int(np.searchsorted(rollup.starts, np.datetime64(str(year), 'D')))
+    last = int(np.searchsorted(rollup.starts, np.datetime64(str(year + 1), 'D')))
+
+    if row is not None:
+        counts = rollup.counts[row, first:last]
+    else:
+        # An unknown neighborhood, or a rollup without any row
+        counts = np.zeros(0, dtype=rollup.counts.dtype)
+    planted = np.flatnonzero(counts)
+    if len(planted):
+        starts = rollup.starts[first + planted[0]:first + planted[-1] + 1]
+        counts = counts[planted[0]:planted[-1] + 1]
+    else:
+        starts, counts = rollup.starts[:0], counts[:0]
+
+    return pd.DataFrame({
+        'Date_Plantation': pd.to_datetime(starts),
+        'Counts': counts.astype(np.int64)
+    })
+
+
+def merge_daily_indexes(first, second):
+    '''
+        Adds the counts of two daily indexes, growing the matrix to
+        cover the neighborhoods and days of both.
+
+        Args:
+            first: The first daily index, or None
+            second: The second daily index
+        Returns:
+            The merged daily index.
+    '''
+    if first is None or not first.counts.size:
+        return second
+    if not second.counts.size:
+        return first
+
+    neighborhoods = dict(first.neighborhoods)
+    for name in second.neighborhoods:
+        neighborhoods.setdefault(name, len(neighborhoods))
+
+    start = min(first.start, second.start)
+    end = max(first.start + first.counts.shape[1], second.start + second.counts.shape[1])
+    counts = np.zeros((len(neighborhoods), int((end - start).astype(np.int64))), dtype=np.int32)
+
+    for index in (first, second):
+        rows = [neighborhoods[name] for name in index.neighborhoods]
+        offset = int((index.start - start).astype(np.int64))
+        counts[rows, offset:offset + index.counts.shape[1]] += index.counts
+
+    return DailyIndex(neighborhoods, start, counts)
+
+
+def fold_yearly_counts(counts, dataframe):
+    '''
+        Adds the yearly counts of the given rows to a running
+        (neighborhood, year) count table.
+
+        Args:
+            counts: The running counts, as a series indexed by
+                'Arrond_Nom' and 'Date_Plantation', or None
+            dataframe: The new rows
+        Returns:
+            The updated running counts.
+    '''
+    new_counts = summarize_yearly_counts(dataframe)
+    new_counts['Arrond_Nom'] = new_counts['Arrond_Nom'].astype(object)
+    new_counts = new_counts.set_index(['Arrond_Nom', 'Date_Plantation'])['Counts']
+
+    if counts is not None:
+        new_counts = pd.concat([counts, new_counts])
+
+    return new_counts.groupby(level=['Arrond_Nom', 'Date_Plantation']).sum()
+
+
+def summarize_chunked(path, start, end, chunksize=CHUNK_SIZE, size=None):
+    '''
+        Streaming version of 'filter_years', 'summarize_yearly_counts'
+        and 'build_daily_index', which reads the .csv file in chunks
+        instead of taking the whole dataframe.
+
+        Each chunk is folded into the running yearly counts and
+        daily index, so only those are kept in memory. The yearly
+        counts give exactly the heatmap matrix of the in-memory
+        path once passed to 'restructure_df'.
+
+        Args:
+            path: The path to the .csv file
+            start: The starting year (inclusive)
+            end: The ending year (inclusive)
+            chunksize: The number of rows to read at a time
+            size: The number of bytes of the file to read, ending
+                on a line break, or None to read the whole file
         Returns:
-            The daily tree count data for that
-            neighborhood and year.
+            yearly_df: The yearly counts, as returned by
+                'summarize_yearly_counts'
+            daily_index: The daily index, as returned by
+                'build_daily_index'
     '''
+    counts = None
+    daily_index = None
+    with open_prefix(path, size) as source:
+        for chunk in read_csv(source, TREES_PROFILE, chunksize=chunksize):
+            chunk = filter_years(chunk, start, end)
+            counts = fold_yearly_counts(counts, chunk)
+            daily_index = merge_daily_indexes(daily_index, build_daily_index(chunk))
 
-    daily_df = dataframe[(dataframe['Arrond_Nom'] == arrond) & (dataframe['Date_Plantation'].dt.year == pd.to_datetime(year).year)]
-    daily_df = daily_df.groupby(pd.DatetimeIndex(daily_df['Date_Plantation'])).size().reset_index(name='Counts')
-    daily_df.set_index('Date_Plantation', inplace=True)
-    daily_df = daily_df.resample('d').sum().fillna(0)
-    daily_df.reset_index(inplace=True)
+    if counts is None:
+        empty = pd.DataFrame({'Arrond_Nom': [], 'Date_Plantation': pd.to_datetime([])})
+        counts = fold_yearly_counts(None, empty)
+        daily_index = build_daily_index(empty)
 
-    return daily_df
+    return counts.reset_index(name='Counts'), daily_index
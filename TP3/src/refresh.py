@@ -0,0 +1,147 @@
+'''
+    Contains the incremental refresh of the counts from the .csv file.
+
+    The tree inventory is only ever appended to. The refresher remembers
+    the offset up to which the file was read, and on each poll it parses
+    only the complete lines written after that offset. Those rows are
+    folded into the yearly counts and the daily index, so a refresh costs
+    time in proportion to the new rows, not the whole history. A file
+    which was truncated or replaced is read again from the start.
+'''
+import io
+import os
+import threading
+
+import preprocess
+
+from loading import TREES_PROFILE, get_complete_size, read_csv
+
+
+class AppendRefresher:
+    '''
+        Keeps the yearly counts and the daily index up to date with
+        the rows appended to the .csv file.
+    '''
+
+    def __init__(self, path, start, end, yearly_df, daily_index, offset):
+        '''
+            Args:
+                path: The path to the .csv file
+                start: The starting year (inclusive)
+                end: The ending year (inclusive)
+                yearly_df: The yearly counts of the rows already read
+                daily_index: The daily index of the rows already read
+                offset: The number of bytes of the file already read,
+                    which must end on a line break
+        '''
+        self.path = path
+        self.start = start
+        self.end = end
+        self.lock = threading.Lock()
+        self.counts = yearly_df.astype({'Arrond_Nom': object}).set_index(
+            ['Arrond_Nom', 'Date_Plantation'])['Counts']
+        self.daily_index = daily_index
+        self.offset = offset
+        self.version = 0
+
+        with open(path, 'rb') as source:
+            self.header = source.readline()
+            self.inode = os.fstat(source.fileno()).st_ino
+
+    def is_replaced(self):
+        '''
+            Returns:
+                True if the file is now shorter than what was
+                read, or is another file, e.g. after a rotation.
+        '''
+        stat = os.stat(self.path)
+
+        return stat.st_size < self.offset or stat.st_ino != self.inode
+
+    def reload(self):
+        '''
+            Reads the whole file again, up to its last line break.
+
+            Returns:
+                The set of (neighborhood, year) pairs counted
+                before or after the reload.
+        '''
+        offset = get_complete_size(self.path)
+        yearly_df, daily_index = preprocess.summarize_chunked(
+            self.path, self.start, self.end, size=offset)
+        counts = yearly_df.astype({'Arrond_Nom': object}).set_index(
+            ['Arrond_Nom', 'Date_Plantation'])['Counts']
+
+        changed = set(self.counts.index) | set(counts.index)
+        self.counts, self.daily_index, self.offset = counts, daily_index, offset
+        with open(self.path, 'rb') as source:
+            self.header = source.readline()
+            self.inode = os.fstat(source.fileno()).st_ino
+        self.version += 1
+
+        return changed
+
+    def read_new_rows(self):
+        '''
+            Reads the complete lines appended since the last read.
+
+            Returns:
+                The dataframe of the new rows, or None if there
+                are none.
+        '''
+        size = os.path.getsize(self.path)
+        if size <= self.offset:
+            return None
+
+        with open(self.path, 'rb') as source:
+            source.seek(self.offset)
+            appended = source.read(size - self.offset)
+
+        # A line still being written is left for the next poll
+        complete = appended.rfind(b'\n') + 1
+        if not complete:
+            return None
+        self.offset += complete
+
+        return read_csv(io.BytesIO(self.header + appended[:complete]), TREES_PROFILE)
+
+    def poll(self):
+        '''
+            Folds the rows appended since the last poll into the
+            counts, or counts the whole file again if it was
+            truncated or replaced. Each poll which finds new rows
+            increments the version of the counts.
+
+            Returns:
+                The set of (neighborhood, year) pairs which changed.
+        '''
+        with self.lock:
+            if self.is_replaced():
+                return self.reload()
+
+            new_rows = self.read_new_rows()
+            if new_rows is None:
+                return set()
+
+            new_rows = preprocess.filter_years(new_rows, self.start, self.end)
+            if new_rows.empty:
+                return set()
+
+            self.counts = preprocess.fold_yearly_counts(self.counts, new_rows)
+            self.daily_index = preprocess.merge_daily_indexes(
+                self.daily_index, preprocess.build_daily_index(new_rows))
+            self.version += 1
+
+            return set(zip(new_rows['Arrond_Nom'].astype(object),
+                           new_rows['Date_Plantation'].dt.year))
+
+    def get_snapshot(self):
+        '''
+            Returns:
+                version: The current version of the counts
+                yearly_df: The current yearly counts, as returned
+                    by 'preprocess.summarize_yearly_counts'
+                daily_index: The current daily index
+        '''
+        with self.lock:
+            return self.version, self.counts.reset_index(name='Counts'), self.daily_index
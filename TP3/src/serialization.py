@@ -0,0 +1,168 @@
+'''
+    Contains the serialization layer used to send the figures to the browser.
+
+    The figures are encoded with orjson when it is installed. It encodes
+    the NumPy arrays of the traces natively instead of converting them to
+    lists of Python numbers first. A static layout is encoded only once
+    and its bytes are sent again for every request. It can also be kept
+    compressed, and revalidated by the browser through its ETag.
+
+    The plotly.js version bundled with Dash 2.6 cannot decode the base64
+    typed arrays introduced in plotly.js 2.28, so arrays are sent as
+    regular JSON arrays.
+'''
+import gzip
+import hashlib
+
+import dash
+import flask
+import plotly.io as pio
+
+try:
+    import orjson  # noqa : F401 pylint: disable=unused-import
+    JSON_ENGINE = 'orjson'
+except ImportError:
+    JSON_ENGINE = 'json'
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+def use_fast_json():
+    '''
+        Makes Plotly, and Dash through it, encode every figure
+        and callback response with the fastest available engine.
+    '''
+    pio.json.config.default_engine = JSON_ENGINE
+
+
+def to_json_bytes(value):
+    '''
+        Encodes the given value like Dash does for its responses.
+
+        Args:
+            value: The layout, figure or other value to encode
+        Returns:
+            The encoded bytes.
+    '''
+    return pio.json.to_json_plotly(value).encode('utf-8')
+
+
+def freeze_figure(fig):
+    '''
+        Converts a figure to the dictionaries and NumPy arrays it is
+        made of. Sending a frozen figure skips the conversion of the
+        Graph Object to a dictionary done for every response.
+
+        Args:
+            fig: The figure to freeze
+        Returns:
+            The figure as a dictionary.
+    '''
+    return fig.to_plotly_json()
+
+
+class CachedLayoutDash(dash.Dash):
+    '''
+        A Dash app which encodes its layout only once, unless the
+        layout is a function or is replaced.
+    '''
+
+    def __init__(self, *args, **kwargs):
+        self.encoded_layout = None
+        self.encoded_for = None
+        super().__init__(*args, **kwargs)
+
+    def serve_layout(self):
+        '''
+            Serves the encoded layout, encoding it on the first request.
+
+            Returns:
+                The response holding the layout.
+        '''
+        if self._layout_is_function:  # pylint: disable=protected-access
+            return super().serve_layout()
+
+        layout = self.layout
+        if self.encoded_for is not layout:
+            self.encoded_layout = to_json_bytes(layout)
+            self.encoded_for = layout
+
+        return flask.Response(self.encoded_layout, mimetype='application/json')
+
+
+def compress_layout(encoded):
+    '''
+        Compresses the encoded layout with every available encoding.
+
+        Args:
+            encoded: The encoded layout
+        Returns:
+            A dictionary mapping each content encoding, in order
+            of preference, to the compressed layout.
+    '''
+    variants = {}
+    if brotli is not None:
+        variants['br'] = brotli.compress(encoded)
+    variants['gzip'] = gzip.compress(encoded, compresslevel=9)
+
+    return variants
+
+
+class CompressedLayoutDash(CachedLayoutDash):
+    '''
+        A Dash app which also keeps its encoded layout compressed,
+        and lets the browser revalidate it with a strong ETag per
+        content encoding.
+
+        The compressed variants are built once per layout, so a
+        static figure is never encoded nor compressed again.
+    '''
+
+    def __init__(self, *args, **kwargs):
+        self.layout_variants = None
+        super().__init__(*args, **kwargs)
+
+    def serve_layout(self):
+        '''
+            Serves the layout compressed with the best encoding the
+            browser accepts, or answers 304 if the browser already
+            has it.
+
+            Returns:
+                The response holding the layout.
+        '''
+        if self._layout_is_function:  # pylint: disable=protected-access
+            return super().serve_layout()
+
+        layout = self.layout
+        variants = self.layout_variants
+        if variants is None or variants[0] is not layout:
+            encoded = to_json_bytes(layout)
+            etag = hashlib.sha256(encoded).hexdigest()[:32]
+            variants = (layout, etag, encoded, compress_layout(encoded))
+            self.layout_variants = variants
+
+        _, etag, encoded, compressed = variants
+
+        # The first preferred encoding among those the browser accepts the most
+        qualities = flask.request.accept_encodings
+        encoding = max(compressed, key=lambda name: qualities[name])
+        if qualities[encoding] > 0:
+            body = compressed[encoding]
+            # Each encoding is its own representation, with its own strong ETag
+            etag += '-' + encoding
+        else:
+            encoding, body = None, encoded
+
+        headers = {'ETag': '"' + etag + '"', 'Cache-Control': 'no-cache', 'Vary': 'Accept-Encoding'}
+        if encoding is not None:
+            headers['Content-Encoding'] = encoding
+
+        if flask.request.if_none_match.contains(etag):
+            headers.pop('Content-Encoding', None)
+            return flask.Response(status=304, headers=headers)
+
+        return flask.Response(body, mimetype='application/json', headers=headers)
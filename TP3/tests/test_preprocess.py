@@ -0,0 +1,92 @@
+'''
+    Checks that the streaming ingest matches the in-memory path.
+'''
+import numpy as np
+import pandas as pd
+import pandas.testing as tm
+import pytest
+
+import preprocess
+
+from loading import TREES_PROFILE, get_complete_size, read_csv
+
+NEIGHBORHOODS = ['Ahuntsic - Cartierville', 'LaSalle', 'Le Plateau-Mont-Royal', 'Verdun']
+
+
+@pytest.fixture(name='path')
+def fixture_path(tmp_path):
+    '''
+        Writes a small inventory, with some trees lacking
+        a plantation date.
+    '''
+    rng = np.random.default_rng(0)
+    size = 5000
+    dates = pd.Timestamp('1990-01-01') + pd.to_timedelta(rng.integers(0, 30 * 365, size), 'D')
+    dates = pd.Series(dates.strftime('%Y/%m/%d')).mask(rng.random(size) < 0.05)
+    path = tmp_path / 'arbres.csv'
+    pd.DataFrame({
+        'Arrond_Nom': rng.choice(NEIGHBORHOODS, size),
+        'Essence_fr': 'Érable',
+        'Date_Plantation': dates
+    }).to_csv(path, index=False)
+
+    return path
+
+
+def get_daily_counts(daily_index):
+    '''
+        Returns:
+            The non-zero counts of the daily index, by
+            neighborhood and day.
+    '''
+    rows, days = np.nonzero(daily_index.counts)
+    names = np.array(list(daily_index.neighborhoods), dtype=object)[rows]
+    dates = daily_index.start + days.astype('timedelta64[D]')
+
+    return pd.Series(daily_index.counts[rows, days], index=[names, dates]).sort_index()
+
+
+def summarize(dataframe, start, end):
+    '''
+        Returns:
+            The yearly counts and the daily index of the
+            in-memory path.
+    '''
+    dataframe = preprocess.filter_years(dataframe, start, end)
+
+    return preprocess.summarize_yearly_counts(dataframe), preprocess.build_daily_index(dataframe)
+
+
+def check_same(result, expected):
+    '''
+        Checks that two pairs of yearly counts and daily
+        index hold the same counts.
+    '''
+    yearly_df, daily_index = result
+    expected_df, expected_index = expected
+
+    yearly_df = yearly_df.astype({'Arrond_Nom': str}).sort_values(['Arrond_Nom', 'Date_Plantation'])
+    expected_df = expected_df.astype({'Arrond_Nom': str}).sort_values(
+        ['Arrond_Nom', 'Date_Plantation'])
+    tm.assert_frame_equal(yearly_df.reset_index(drop=True), expected_df.reset_index(drop=True),
+                          check_dtype=False)
+    tm.assert_series_equal(get_daily_counts(daily_index), get_daily_counts(expected_index),
+                           check_dtype=False)
+
+
+@pytest.mark.parametrize('start, end', [(None, None), (2000, 2010)])
+def test_summarize_chunked_matches_in_memory(path, start, end):
+    result = preprocess.summarize_chunked(path, start, end, chunksize=777)
+
+    check_same(result, summarize(read_csv(path, TREES_PROFILE), start, end))
+
+
+def test_summarize_chunked_stops_at_size(path):
+    size = get_complete_size(path)
+    with open(path, 'a', encoding='utf-8') as inventory:
+        inventory.write('Verdun,Érable,2015/06/01\nVerdun,Érable,2015/06')
+
+    result = preprocess.summarize_chunked(path, None, None, chunksize=777, size=size)
+
+    dataframe = read_csv(path, TREES_PROFILE, nrows=5000)
+    check_same(result, summarize(dataframe, None, None))
@@ -9,57 +9,83 @@
 
     This file contains the source code for TP4.
 '''
-import json
-
-import dash
 import dash_html_components as html
 import dash_core_components as dcc
 
-import pandas as pd
-
 import preprocess
 import bubble
+import serialization
+
+from lazy import LazyLoader
+from loading import DATA_PATH, read_years
+
+serialization.use_fast_json()
 
-app = dash.Dash(__name__)
+app = serialization.CompressedLayoutDash(__name__, compress=True)
 app.title = 'TP4 | INF8808'
 
-with open('../src/assets/data/countriesData.json') as data_file:
-    data = json.load(data_file)
-
-df_2000 = pd.json_normalize(data, '2000')
-df_2015 = pd.json_normalize(data, '2015')
-
-df_2000 = preprocess.round_decimals(df_2000)
-df_2015 = preprocess.round_decimals(df_2015)
-
-gdp_range = preprocess.get_range('GDP', df_2000, df_2015)
-co2_range = preprocess.get_range('CO2', df_2000, df_2015)
-
-df = preprocess.combine_dfs(df_2000, df_2015)
-df = preprocess.sort_dy_by_yr_continent(df)
-
-fig = bubble.get_plot(df, gdp_range, co2_range)
-fig = bubble.update_animation_hover_template(fig)
-fig = bubble.update_animation_menu(fig)
-fig = bubble.update_axes_labels(fig)
-fig = bubble.update_template(fig)
-fig = bubble.update_legend(fig)
-
-fig.update_layout(height=600, width=1000)
-fig.update_layout(dragmode=False)
-
-app.layout = html.Div(className='content', children=[
-    html.Header(children=[
-        html.H1('GDP vs. CO2 emissions'),
-        html.H2('In countries around the world')
-    ]),
-    html.Main(className='viz-container', children=[
-        dcc.Graph(className='graph', figure=fig, config=dict(
-            scrollZoom=False,
-            showTips=False,
-            showAxisDragHandles=False,
-            doubleClick=False,
-            displayModeBar=False
-            ))
-    ])
-])
+# When True, the data is loaded by the first request or by the warm-up
+# route instead of when the app is imported
+LAZY_LOADING = True
+
+# How the bubbles are drawn : 'auto' switches from SVG to WebGL
+# above WEBGL_THRESHOLD bubbles in a year
+RENDER_MODE = 'auto'
+WEBGL_THRESHOLD = bubble.WEBGL_THRESHOLD
+
+
+def load_data(loader):
+    '''
+        Loads the data, then builds the figure and the layout.
+
+        Args:
+            loader: The lazy loader timing each stage
+    '''
+    with loader.stage('read'):
+        years = read_years(DATA_PATH)
+
+    with loader.stage('preprocess'):
+        years = {year: preprocess.round_decimals(year_df) for year, year_df in years.items()}
+
+        # Every year of the file is animated
+        df, ranges = preprocess.combine_years(years)
+        df = preprocess.sort_dy_by_yr_continent(df)
+
+    with loader.stage('figure'):
+        fig = bubble.get_timeline_plot(df, ranges['GDP'], ranges['CO2'],
+                                       render_mode=RENDER_MODE, threshold=WEBGL_THRESHOLD)
+        fig = bubble.update_animation_hover_template(fig)
+        fig = bubble.update_animation_menu(fig)
+        fig = bubble.update_axes_labels(fig)
+        fig = bubble.update_template(fig)
+        fig = bubble.update_legend(fig)
+
+        fig.update_layout(height=600, width=1000)
+        fig.update_layout(dragmode=False)
+
+    with loader.stage('layout'):
+        app.layout = html.Div(className='content', children=[
+            html.Header(children=[
+                html.H1('GDP vs. CO2 emissions'),
+                html.H2('In countries around the world')
+            ]),
+            html.Main(className='viz-container', children=[
+                dcc.Graph(className='graph', figure=fig, config=dict(
+                    scrollZoom=False,
+                    showTips=False,
+                    showAxisDragHandles=False,
+                    doubleClick=False,
+                    displayModeBar=False
+                    ))
+            ])
+        ])
+
+
+loader = LazyLoader(load_data)
+loader.init_server(app.server)
+
+if LAZY_LOADING:
+    # Replaced by the real layout once the data is loaded
+    app.layout = html.Div(className='content')
+else:
+    loader.ensure_loaded()
@@ -2,12 +2,39 @@
     This file contains the code for the bubble plot.
 '''
 
+import math
+
+import numpy as np
+import pandas as pd
 import plotly.express as px
+import plotly.graph_objects as go
 
 import hover_template
 
+# The ways the markers can be drawn : 'auto' uses WebGL above the threshold
+RENDER_MODES = ('auto', 'svg', 'webgl')
+
+# Number of markers in a year above which 'auto' draws them with WebGL
+WEBGL_THRESHOLD = 1000
+
 
-def get_plot(my_df, gdp_range, co2_range):
+def use_webgl(render_mode, points, threshold=WEBGL_THRESHOLD):
+    '''
+        Args:
+            render_mode: One of RENDER_MODES
+            points: The number of markers in the largest year
+            threshold: The number of markers above which 'auto'
+                draws them with WebGL
+        Returns:
+            True if the markers are drawn with WebGL.
+    '''
+    if render_mode not in RENDER_MODES:
+        raise ValueError(f'Unknown render mode {render_mode!r}, expected one of {RENDER_MODES}')
+
+    return render_mode == 'webgl' or (render_mode == 'auto' and points > threshold)
+
+
+def get_plot(my_df, gdp_range, co2_range, render_mode='auto', threshold=WEBGL_THRESHOLD):
     '''
         Generates the bubble plot.
 
@@ -19,13 +46,21 @@ def get_plot(my_df, gdp_range, co2_range):
         The markers' maximum size is 30 and their minimum
         size is 6.
 
+        Above the threshold of markers in a year, the markers
+        are drawn with WebGL.
+
         Args:
             my_df: The dataframe to display
             gdp_range: The range for the x axis
             co2_range: The range for the y axis
+            render_mode: One of RENDER_MODES
+            threshold: The number of markers in a year above
+                which 'auto' draws them with WebGL
         Returns:
             The generated figure
     '''
+    points = my_df['Year'].value_counts().max() if len(my_df) else 0
+    webgl = use_webgl(render_mode, points, threshold)
 
     fig = px.scatter(
         my_df,
@@ -42,7 +77,8 @@ def get_plot(my_df, gdp_range, co2_range):
         range_y=co2_range,
         size_max=30,
         color_discrete_sequence=px.colors.qualitative.Set1,
-        hover_data=['Country Name', 'Population']
+        hover_data=['Country Name', 'Population'],
+        render_mode='webgl' if webgl else 'svg'
     )
 
     fig.update_traces(marker_sizemin=6)
@@ -50,11 +86,151 @@ def get_plot(my_df, gdp_range, co2_range):
     return fig
 
 
+def get_timeline_plot(my_df, gdp_range, co2_range, size_max=30, size_min=6,
+                      render_mode='auto', threshold=WEBGL_THRESHOLD):
+    '''
+        Generates the same bubble plot as 'get_plot', animated over
+        every year of the dataframe.
+
+        The figure is built directly from one NumPy array per column.
+        There is one trace per continent. The frames only hold what
+        changes from one year to the next : the positions, the sizes
+        and the hover data of the markers. The colors, the sizing and
+        the hover template are set once on the traces.
+
+        Above the threshold of markers in a year, the traces are
+        drawn with WebGL. Its markers cannot be transitioned, so
+        the frames are redrawn instead.
+
+        Args:
+            my_df: The dataframe to display, with a 'Year' column
+            gdp_range: The range for the x axis
+            co2_range: The range for the y axis
+            size_max: The size of the largest marker
+            size_min: The size of the smallest marker
+            render_mode: One of RENDER_MODES
+            threshold: The number of markers in a year above
+                which 'auto' draws them with WebGL
+        Returns:
+            The generated figure
+    '''
+    years, year_codes = np.unique(my_df['Year'].to_numpy(dtype=np.int64), return_inverse=True)
+    # Like plotly express, the colors follow the order of appearance of the continents
+    continents = pd.unique(my_df['Continent'].astype(str))
+    continent_codes = pd.Categorical(my_df['Continent'].astype(str), categories=continents).codes
+
+    gdp = my_df['GDP'].to_numpy(dtype=np.float64)
+    co2 = my_df['CO2'].to_numpy(dtype=np.float64)
+    population = my_df['Population'].to_numpy()
+    countries = my_df['Country Name'].astype(str).to_numpy(dtype=object)
+    customdata = np.column_stack([countries, my_df['Population'].to_numpy(dtype=object)])
+
+    # One stable sort groups the rows by year, then by continent
+    groups = year_codes * len(continents) + continent_codes
+    order = np.argsort(groups, kind='stable')
+    bounds = np.searchsorted(groups[order], np.arange(len(years) * len(continents) + 1))
+
+    points = np.bincount(year_codes).max() if len(year_codes) else 0
+    webgl = use_webgl(render_mode, points, threshold)
+    scatter = go.Scattergl if webgl else go.Scatter
+
+    def get_rows(year_index, continent_index):
+        group = year_index * len(continents) + continent_index
+        return order[bounds[group]:bounds[group + 1]]
+
+    colors = px.colors.qualitative.Set1
+    # The same sizing as plotly express, where the largest marker has an area of size_max²
+    sizeref = population.max() / size_max ** 2 if len(population) else 1
+
+    data = []
+    for index, continent in enumerate(continents):
+        rows = get_rows(0, index)
+        data.append(scatter(
+            name=continent,
+            legendgroup=continent,
+            mode='markers',
+            ids=countries[rows],
+            x=gdp[rows],
+            y=co2[rows],
+            customdata=customdata[rows],
+            marker=dict(
+                color=colors[index % len(colors)],
+                size=population[rows],
+                sizemode='area',
+                sizeref=sizeref,
+                sizemin=size_min
+            )
+        ))
+
+    frames = []
+    for year_index, year in enumerate(years):
+        frame_data = []
+        for index in range(len(continents)):
+            rows = get_rows(year_index, index)
+            frame_data.append(scatter(
+                ids=countries[rows],
+                x=gdp[rows],
+                y=co2[rows],
+                customdata=customdata[rows],
+                marker=dict(size=population[rows])
+            ))
+        frames.append(go.Frame(name=str(year), data=frame_data))
+
+    def get_animation(duration):
+        return dict(frame=dict(duration=duration, redraw=webgl), mode='immediate',
+                    fromcurrent=True, transition=dict(duration=duration, easing='linear'))
+
+    fig = go.Figure(data=data, frames=frames)
+    fig.update_layout(
+        xaxis=dict(type='log', range=[math.log(value, 10) for value in gdp_range],
+                   title_text='GDP'),
+        yaxis=dict(type='log', range=[math.log(value, 10) for value in co2_range],
+                   title_text='CO2'),
+        legend=dict(title_text='Continent', tracegroupgap=0, itemsizing='constant'),
+        margin=dict(t=60),
+        updatemenus=[dict(
+            buttons=[
+                dict(args=[None, get_animation(500)], label='&#9654;', method='animate'),
+                dict(args=[[None], get_animation(0)], label='&#9724;', method='animate')
+            ],
+            direction='left',
+            pad=dict(r=10, t=70),
+            showactive=False,
+            type='buttons',
+            x=0.1,
+            xanchor='right',
+            y=0,
+            yanchor='top'
+        )],
+        sliders=[dict(
+            active=0,
+            currentvalue=dict(prefix='Year='),
+            len=0.9,
+            pad=dict(b=10, t=60),
+            x=0.1,
+            xanchor='left',
+            y=0,
+            yanchor='top',
+            steps=[dict(
+                args=[[str(year)], get_animation(0)],
+                label=str(year),
+                method='animate'
+            ) for year in years]
+        )]
+    )
+
+    return fig
+
+
 def update_animation_hover_template(fig):
     '''
         Sets the hover template of the figure,
         as well as the hover template of each
         trace of each animation frame of the figure
+        which defines its own.
+
+        The frames of 'get_timeline_plot' do not define
+        one, so they keep the template of the traces.
 
         Args:
             fig: The figure to update
@@ -66,7 +242,8 @@ def update_animation_hover_template(fig):
 
     for frame in fig.frames:
         for trace in frame.data:
-            trace.hovertemplate = hover_template.get_bubble_hover_template()
+            if trace.hovertemplate is not None:
+                trace.hovertemplate = hover_template.get_bubble_hover_template()
 
     return fig
 
@@ -76,19 +253,25 @@ def update_animation_menu(fig):
         Updates the animation menu to show the current year, and to remove
         the unnecessary 'Stop' button.
 
+        WebGL traces cannot be transitioned, so their frames are
+        redrawn when animated.
+
         Args:
             fig: The figure containing the menu to update
         Returns
             The updated figure
     '''
 
+    redraw = any(trace.type == 'scattergl' for trace in fig.data)
+
     # Remove the 'Stop' button from the animation menu
     fig.update_layout(
         updatemenus=[dict(
         type="buttons",
         buttons=list([
             dict(
-                args=[None, dict(frame=dict(duration=500, redraw=False), mode="immediate", fromcurrent=True, transition=dict(duration=500, easing="linear"))],
+                args=[None, dict(frame=dict(duration=500, redraw=redraw), mode="immediate",
+                                 fromcurrent=True, transition=dict(duration=500, easing="linear"))],
                 label="Animate",
                 method="animate"
             ),
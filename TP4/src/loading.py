@@ -0,0 +1,283 @@
+'''
+    Contains the streaming loader of the year-keyed .json file.
+
+    The file maps each year to the list of the countries' records. It is
+    read block by block and each record is decoded on its own, straight
+    into the columns of its year, so the whole object graph of the file
+    is never held in memory. The country and continent names are stored
+    as categorical codes shared by every year.
+'''
+import json
+
+import numpy as np
+import pandas as pd
+
+DATA_PATH = '../src/assets/data/countriesData.json'
+
+# The text columns, stored as categorical codes
+CATEGORICAL_COLUMNS = ['Country Name', 'Continent']
+
+# Number of characters read at a time
+BLOCK_SIZE = 2**16
+
+
+class JSONScanner:
+    '''
+        Reads the JSON values of a file one at a time, refilling
+        a buffer from the file as it is consumed.
+    '''
+
+    def __init__(self, source, block_size=BLOCK_SIZE):
+        '''
+            Args:
+                source: The text file to read
+                block_size: The number of characters read at a time
+        '''
+        self.source = source
+        self.block_size = block_size
+        self.decoder = json.JSONDecoder()
+        self.buffer = ''
+        self.position = 0
+
+    def fill(self):
+        '''
+            Reads the next block of the file, dropping the part
+            of the buffer already consumed.
+
+            Returns:
+                False if the end of the file was reached.
+        '''
+        block = self.source.read(self.block_size)
+        self.buffer = self.buffer[self.position:] + block
+        self.position = 0
+
+        return bool(block)
+
+    def peek(self):
+        '''
+            Skips the whitespace before the next character.
+
+            Returns:
+                The next character, or '' at the end of the file.
+        '''
+        while True:
+            while self.position < len(self.buffer) and self.buffer[self.position].isspace():
+                self.position += 1
+            if self.position < len(self.buffer) or not self.fill():
+                return self.buffer[self.position:self.position + 1]
+
+    def expect(self, characters):
+        '''
+            Consumes the next character, which must be one
+            of the given ones.
+
+            Args:
+                characters: The allowed characters
+            Returns:
+                The consumed character.
+        '''
+        character = self.peek()
+        if not character or character not in characters:
+            raise ValueError(f'Expected one of {characters!r} at character '
+                             f'{self.position} of the buffer, found {character!r}')
+        self.position += 1
+
+        return character
+
+    def decode(self):
+        '''
+            Decodes the next JSON value, reading more of the file
+            while the value is incomplete.
+
+            Returns:
+                The decoded value.
+        '''
+        self.peek()
+        while True:
+            try:
+                value, self.position = self.decoder.raw_decode(self.buffer, self.position)
+                return value
+            except json.JSONDecodeError:
+                if not self.fill():
+                    raise
+
+
+class YearColumns:
+    '''
+        The columns of a year, written record by record into
+        preallocated typed arrays which double in size when full.
+
+        A column starts as an integer array, and becomes a float
+        array with NaN for the missing numbers as soon as a number
+        is missing or decimal. The text columns hold the codes of
+        their categories, with -1 for the missing names.
+    '''
+
+    def __init__(self, names, capacity=1024):
+        '''
+            Args:
+                names: The code of each name, for each text column,
+                    shared by every year
+                capacity: The number of records the arrays hold
+                    before growing
+        '''
+        self.names = names
+        self.capacity = capacity
+        self.length = 0
+        self.columns = {}
+
+    def create(self, column, value):
+        '''
+            Creates a column, in which the previous records are missing.
+
+            Args:
+                column: The name of the column
+                value: The first value of the column
+            Returns:
+                The array of the column.
+        '''
+        if column in self.names:
+            array = np.full(self.capacity, -1, dtype=np.int64)
+        elif isinstance(value, int) and not isinstance(value, bool) and not self.length:
+            array = np.zeros(self.capacity, dtype=np.int64)
+        elif value is None or isinstance(value, (int, float)):
+            array = np.full(self.capacity, np.nan)
+        else:
+            array = np.full(self.capacity, None, dtype=object)
+        self.columns[column] = array
+
+        return array
+
+    def retype(self, column, dtype):
+        '''
+            Converts a column to a wider type, filling the
+            records not written yet as missing.
+
+            Args:
+                column: The name of the column
+                dtype: The new type of the column
+            Returns:
+                The array of the column.
+        '''
+        array = np.full(self.capacity, np.nan if dtype == np.float64 else None, dtype=dtype)
+        array[:self.length] = self.columns[column][:self.length]
+        self.columns[column] = array
+
+        return array
+
+    def grow(self):
+        '''
+            Doubles the capacity of every column.
+        '''
+        self.capacity *= 2
+        for column, array in self.columns.items():
+            if array.dtype == object:
+                grown = np.full(self.capacity, None, dtype=object)
+            elif array.dtype == np.float64:
+                grown = np.full(self.capacity, np.nan)
+            else:
+                grown = np.full(self.capacity, -1 if column in self.names else 0, dtype=array.dtype)
+            grown[:self.length] = array[:self.length]
+            self.columns[column] = grown
+
+    def append(self, record):
+        '''
+            Writes a record after the previous ones.
+
+            Args:
+                record: The dictionary of the record's values
+        '''
+        if self.length == self.capacity:
+            self.grow()
+        row = self.length
+
+        for column, value in record.items():
+            array = self.columns.get(column)
+            if array is None:
+                array = self.create(column, value)
+
+            if column in self.names:
+                if value is not None:
+                    array[row] = self.names[column].setdefault(value, len(self.names[column]))
+            elif array.dtype == np.int64:
+                if isinstance(value, int) and not isinstance(value, bool):
+                    array[row] = value
+                elif value is None or isinstance(value, float):
+                    self.retype(column, np.float64)[row] = np.nan if value is None else value
+                else:
+                    self.retype(column, object)[row] = value
+            elif array.dtype == np.float64:
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    array[row] = value
+                elif value is not None:
+                    self.retype(column, object)[row] = value
+            else:
+                array[row] = value
+
+        # A column missing from the record is filled as missing
+        if len(record) < len(self.columns):
+            for column, array in self.columns.items():
+                if column not in record and array.dtype == np.int64 and column not in self.names:
+                    self.retype(column, np.float64)
+
+        self.length += 1
+
+    def to_dataframe(self):
+        '''
+            Returns:
+                The dataframe of the records. The text columns are
+                categorical, with the sorted names as categories.
+        '''
+        data = {}
+        for column, array in self.columns.items():
+            array = array[:self.length]
+            if column in self.names:
+                names = self.names[column]
+                # The categories are sorted, so sorting on the codes sorts on the names
+                data[column] = pd.Categorical.from_codes(array, list(names)) \
+                    .set_categories(sorted(names))
+            else:
+                data[column] = array
+        return pd.DataFrame(data)
+
+
+def read_years(path=DATA_PATH, block_size=BLOCK_SIZE):
+    '''
+        Reads every year of the .json file.
+
+        Args:
+            path: The path to the .json file
+            block_size: The number of characters read at a time
+        Returns:
+            A dictionary mapping each year key of the file, in the
+            file's order, to the dataframe of its records. The text
+            columns are categorical, with the same sorted categories
+            in every year.
+    '''
+    names = {column: {} for column in CATEGORICAL_COLUMNS}
+    years = {}
+
+    with open(path, encoding='utf-8') as source:
+        scanner = JSONScanner(source, block_size)
+        scanner.expect('{')
+        if scanner.peek() == '}':
+            scanner.expect('}')
+        else:
+            while True:
+                year = scanner.decode()
+                scanner.expect(':')
+                scanner.expect('[')
+
+                columns = years.setdefault(year, YearColumns(names))
+                if scanner.peek() == ']':
+                    scanner.expect(']')
+                else:
+                    while True:
+                        columns.append(scanner.decode())
+                        if scanner.expect(',]') == ']':
+                            break
+
+                if scanner.expect(',}') == '}':
+                    break
+
+    return {year: columns.to_dataframe() for year, columns in years.items()}
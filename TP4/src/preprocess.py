@@ -1,6 +1,8 @@
 '''
     Contains some functions to preprocess the data used in the visualisation.
 '''
+import numpy as np
+import pandas as pd
 
 
 def round_decimals(my_df):
@@ -17,20 +19,100 @@ def round_decimals(my_df):
     return my_df
 
 
-def get_range(col, df1, df2):
+def get_range(col, *dfs):
     '''
         An array containing the minimum and maximum values for the given
-        column in the two dataframes.
+        column in the dataframes.
 
         args:
             col: The name of the column for which we want the range
-            df1: The first dataframe containing a column with the given name
-            df2: The first dataframe containing a column with the given name
+            dfs: The dataframes containing a column with the given name
         returns:
-            The minimum and maximum values across the two dataframes
+            The minimum and maximum values across the dataframes
     '''
 
-    return [min(df1[col].min(),df1[col].min()), max(df1[col].max(),df2[col].max())]
+    return [min(df[col].min() for df in dfs), max(df[col].max() for df in dfs)]
+
+
+def combine_columns(series, bounds):
+    '''
+        Copies the columns of the same name of several dataframes
+        into one column, allocated once.
+
+        args:
+            series: The column of each dataframe, or None where
+                a dataframe does not have it
+            bounds: The position of the first row of each dataframe
+                in the result, followed by the number of rows
+        returns:
+            The combined column.
+    '''
+    present = [column for column in series if column is not None]
+
+    if any(isinstance(column.dtype, pd.CategoricalDtype) for column in present):
+        categories = present[0].cat.categories if all(
+            isinstance(column.dtype, pd.CategoricalDtype)
+            and column.cat.categories.equals(present[0].cat.categories) for column in present
+        ) else pd.Index(sorted(set().union(*(column.dropna().unique() for column in present))))
+
+        codes = np.full(bounds[-1], -1, dtype=np.int64)
+        for index, column in enumerate(series):
+            if column is not None:
+                if not isinstance(column.dtype, pd.CategoricalDtype) \
+                        or not column.cat.categories.equals(categories):
+                    column = pd.Series(pd.Categorical(column, categories=categories))
+                codes[bounds[index]:bounds[index + 1]] = column.cat.codes
+
+        return pd.Categorical.from_codes(codes, categories)
+
+    dtype = np.result_type(*(column.dtype for column in present))
+    if len(present) < len(series):
+        dtype = np.result_type(dtype, np.float64)
+    values = np.full(bounds[-1], np.nan, dtype=dtype) if len(present) < len(series) \
+        else np.empty(bounds[-1], dtype=dtype)
+    for index, column in enumerate(series):
+        if column is not None:
+            values[bounds[index]:bounds[index + 1]] = column.to_numpy()
+
+    return values
+
+
+def combine_years(dfs, range_cols=('GDP', 'CO2')):
+    '''
+        Combines the dataframes of any number of years, adding a
+        categorical column 'Year'. The result is allocated once and
+        the given dataframes are left unchanged.
+
+        The ranges of the given columns are computed on the
+        combined columns, as they are built.
+
+        args:
+            dfs: A dictionary mapping each year to its dataframe
+            range_cols: The columns for which we want the range
+        returns:
+            The combined dataframe, with the years in ascending
+            order, and a dictionary mapping each of the range
+            columns to its minimum and maximum values.
+    '''
+    years = sorted(dfs, key=int)
+    frames = [dfs[year] for year in years]
+    lengths = np.array([len(frame) for frame in frames], dtype=np.int64)
+    bounds = np.concatenate([[0], np.cumsum(lengths)])
+
+    data = {}
+    ranges = {}
+    for col in dict.fromkeys(col for frame in frames for col in frame.columns):
+        columns = [frame[col] if col in frame else None for frame in frames]
+        data[col] = combine_columns(columns, bounds)
+        if col in range_cols and bounds[-1]:
+            ranges[col] = [np.nanmin(data[col]), np.nanmax(data[col])]
+        elif col in range_cols:
+            ranges[col] = [np.nan, np.nan]
+
+    data['Year'] = pd.Categorical.from_codes(np.repeat(np.arange(len(years)), lengths),
+                                             [int(year) for year in years])
+
+    return pd.DataFrame(data), ranges
 
 
 def combine_dfs(df1, df2):
@@ -48,22 +130,45 @@ def combine_dfs(df1, df2):
             containing the value 2000 or 2015, depending on its
             original dataframe.
     '''
-    df1['Year'] = 2000
-    df2['Year'] = 2015
-    df = df1.append(df2)
+    df = combine_years({2000: df1, 2015: df2}, range_cols=())[0]
 
     return df
 
 
+def get_sort_codes(column):
+    '''
+        args:
+            column: The column to sort on
+        returns:
+            The integer codes giving the order of the column's
+            values, with the missing values last.
+    '''
+    if isinstance(column.dtype, pd.CategoricalDtype) and not column.cat.ordered:
+        # The categories are not necessarily sorted
+        column = column.cat.reorder_categories(column.cat.categories.sort_values())
+        codes = column.cat.codes.to_numpy(dtype=np.int64)
+    else:
+        codes = pd.factorize(column, sort=True)[0].astype(np.int64)
+
+    return np.where(codes < 0, codes.max(initial=0) + 1, codes)
+
+
 def sort_dy_by_yr_continent(my_df):
     '''
         Sorts the dataframe by year and then by continent.
 
+        The rows are sorted on a single integer key, built
+        from the codes of both columns, with a stable sort.
+
         args:
             my_df: The dataframe to sort
         returns:
             The sorted dataframe.
     '''
-    my_df = my_df.sort_values(by=['Year', 'Continent'])
-    
+    years = get_sort_codes(my_df['Year'])
+    continents = get_sort_codes(my_df['Continent'])
+
+    order = np.argsort(years * (continents.max(initial=0) + 1) + continents, kind='stable')
+    my_df = my_df.take(order)
+
     return my_df
@@ -0,0 +1,78 @@
+'''
+    Checks that the streaming loader reads the same records
+    as json.load and pd.json_normalize.
+'''
+import json
+import os
+
+import pandas as pd
+import pandas.testing as tm
+import pytest
+
+from conftest import SRC_DIR
+from loading import CATEGORICAL_COLUMNS, read_years
+
+DATA_PATH = os.path.join(SRC_DIR, 'assets', 'data', 'countriesData.json')
+
+EDGE_CASES = {
+    '2000': [
+        {'Country Name': 'Canada', 'Continent': 'North America', 'GDP': 1, 'Flag': True,
+         'Code': 'CA'},
+        {'Country Name': 'France', 'Continent': 'Europe', 'GDP': 2.5, 'Flag': False},
+        {'Country Name': 'Chile', 'GDP': None, 'Code': 'CL', 'Population': 15},
+        {'Continent': 'Asia', 'Flag': True, 'Population': 7}
+    ],
+    '2015': [
+        {'Country Name': 'Chile', 'Continent': 'South America', 'GDP': 3, 'Code': 7},
+        {'Country Name': 'Japan', 'Continent': 'Asia', 'GDP': 4, 'Code': 'JP'}
+    ],
+    '2016': []
+}
+
+
+def get_expected(path):
+    '''
+        Returns:
+            The dataframe of each year, read with json.load
+            and pd.json_normalize.
+    '''
+    with open(path, encoding='utf-8') as source:
+        data = json.load(source)
+
+    return {year: pd.json_normalize(records) for year, records in data.items()}
+
+
+def check_same(path, block_size):
+    '''
+        Checks that read_years gives the years, columns, types
+        and values of get_expected. Its categorical columns
+        must have sorted categories.
+    '''
+    result = read_years(path, block_size)
+    expected = get_expected(path)
+
+    assert list(result) == list(expected)
+    for year, dataframe in result.items():
+        for column in CATEGORICAL_COLUMNS:
+            if column in dataframe:
+                assert list(dataframe[column].cat.categories) == \
+                    sorted(dataframe[column].cat.categories)
+                dataframe[column] = dataframe[column].astype(object).where(
+                    dataframe[column].notna(), None)
+        if expected[year].empty:
+            assert dataframe.empty
+            continue
+        tm.assert_frame_equal(dataframe, expected[year])
+
+
+@pytest.mark.parametrize('block_size', [7, 2**16])
+def test_read_years_matches_json_normalize(block_size):
+    check_same(DATA_PATH, block_size)
+
+
+@pytest.mark.parametrize('block_size', [3, 2**16])
+def test_read_years_edge_cases(tmp_path, block_size):
+    path = tmp_path / 'edge_cases.json'
+    path.write_text(json.dumps(EDGE_CASES, indent=1), encoding='utf-8')
+
+    check_same(path, block_size)
@@ -22,60 +22,81 @@ import preprocess as preproc
 import map_viz
 import helper
 import callback
+import serialization
 
-app = dash.Dash(__name__)
+from lazy import LazyLoader
+
+serialization.use_fast_json()
+
+app = serialization.CompressedLayoutDash(__name__, compress=True)
 app.title = 'TP5 | INF8808'
 
-with open('./assets/data/montreal.json', encoding='utf-8') as data_file:
-    montreal_data = json.load(data_file)
+# When True, the data is loaded by the first request or by the warm-up
+# route instead of when the app is imported
+LAZY_LOADING = True
+
 
-with open('./assets/data/projetpietonnisation2017.geojson',
-          encoding='utf-8') as data_file:
-    street_data = json.load(data_file)
+def load_data(loader):
+    '''
+        Loads the data, then builds the map and the layout.
 
-street_df = preproc.to_df(street_data)
-street_df = preproc.update_titles(street_df)
-street_df = preproc.sort_df(street_df)
+        Args:
+            loader: The lazy loader timing each stage
+    '''
+    with loader.stage('read'):
+        with open('./assets/data/montreal.json', encoding='utf-8') as data_file:
+            montreal_data = json.load(data_file)
 
-locations = preproc.get_neighborhoods(montreal_data)
-z = len(montreal_data['features']) * [1]
+        with open('./assets/data/projetpietonnisation2017.geojson',
+                  encoding='utf-8') as data_file:
+            street_data = json.load(data_file)
 
-fig = go.Figure()
+    with loader.stage('preprocess'):
+        street_df = preproc.to_df(street_data)
+        street_df = preproc.update_titles(street_df)
+        street_df = preproc.sort_df(street_df)
 
-colorscale = ['#CDD1C4', '#CDD1C4']
+        locations = preproc.get_neighborhoods(montreal_data)
+        z = len(montreal_data['features']) * [1]
 
-fig = map_viz.add_choro_trace(fig, montreal_data, locations, z, colorscale)
-fig = map_viz.add_scatter_traces(fig, street_df, )
+    with loader.stage('figure'):
+        fig = go.Figure()
 
-fig = helper.adjust_map_style(fig)
-fig = helper.adjust_map_sizing(fig)
-fig = helper.adjust_map_info(fig)
+        colorscale = ['#CDD1C4', '#CDD1C4']
 
-app.layout = html.Div(
-    className='row',
-    children=[
-        dcc.Graph(figure=fig, id='graph',
-                  config=dict(
-                      showTips=False,
-                      showAxisDragHandles=False,
-                      displayModeBar=False)),
-        html.Div(
-            className='panel-div',
-            style={
-                'justifyContent': 'center',
-                'alignItems': 'center'},
+        fig = map_viz.add_choro_trace(fig, montreal_data, locations, z, colorscale)
+        fig = map_viz.add_scatter_traces(fig, street_df, )
+
+        fig = helper.adjust_map_style(fig)
+        fig = helper.adjust_map_sizing(fig)
+        fig = helper.adjust_map_info(fig)
+
+    with loader.stage('layout'):
+        app.layout = html.Div(
+            className='row',
             children=[
-                html.Div(id='panel', style={
-                    'visibility': 'hidden',
-                    'border': '1px solid black',
-                    'padding': '10px'},
-                         children=[
-                             html.Div(id='marker-title', style={
-                                 'fontSize': '24px'}),
-                             html.Div(id='mode', style={
-                                 'fontSize': '16px'}),
-                             html.Div(id='theme', style={
-                                 'fontSize': '16px'})])])])
+                dcc.Graph(figure=fig, id='graph',
+                          config=dict(
+                              showTips=False,
+                              showAxisDragHandles=False,
+                              displayModeBar=False)),
+                html.Div(
+                    className='panel-div',
+                    style={
+                        'justifyContent': 'center',
+                        'alignItems': 'center'},
+                    children=[
+                        html.Div(id='panel', style={
+                            'visibility': 'hidden',
+                            'border': '1px solid black',
+                            'padding': '10px'},
+                                 children=[
+                                     html.Div(id='marker-title', style={
+                                         'fontSize': '24px'}),
+                                     html.Div(id='mode', style={
+                                         'fontSize': '16px'}),
+                                     html.Div(id='theme', style={
+                                         'fontSize': '16px'})])])])
 
 
 @app.callback([Output('marker-title', 'children'),
@@ -125,3 +146,13 @@ def display(clicks_fig, figure, title, mode, theme, style): # noqa : E501 pylint
                                            theme,
                                            style)
     return None, None, None, None
+
+
+loader = LazyLoader(load_data)
+loader.init_server(app.server)
+
+if LAZY_LOADING:
+    # Replaced by the real layout once the data is loaded
+    app.layout = html.Div(className='row')
+else:
+    loader.ensure_loaded()